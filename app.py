@@ -1,6 +1,9 @@
 from flask import Flask
 from routes import register_blueprints
 from models import db
+from services.search_backends import init_search_backend
+from services.prefix_trie import init_suggestion_index
+from services.catalog_snapshot import init_catalog_snapshot
 import os
 
 
@@ -14,6 +17,13 @@ def create_app():
     # Registrar todos los blueprints de forma centralizada
     register_blueprints(app)
 
+    # Preparar el índice del backend de búsqueda configurado y las sugerencias,
+    # y cargar los catálogos del último snapshot para no arrancar con el caché vacío
+    with app.app_context():
+        init_search_backend()
+        init_suggestion_index()
+        init_catalog_snapshot()
+
     return app
 
 
@@ -7,4 +7,30 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev_secret_key')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///tickets.db')
-    SQLALCHEMY_TRACK_MODIFICATIONS = False 
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Backend de búsqueda de tickets: ilike, trigram, fts5, tsvector o auto
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'trigram')
+    # Conteo total de los listados: exact (COUNT cacheado), estimated (planificador, sin filtros)
+    # o window (página y total en una sola sentencia con COUNT(*) OVER ())
+    LISTING_COUNT_MODE = os.environ.get('LISTING_COUNT_MODE', 'exact')
+    # Segundos entre intentos de construir el índice de sugerencias si falla al arrancar
+    SUGGESTION_RETRY_INTERVAL = int(os.environ.get('SUGGESTION_RETRY_INTERVAL', 60))
+    # Almacén del caché (services.cache_backends): memory (por proceso), sqlite (archivo
+    # compartido por los workers del servidor) o redis; CACHE_URL es la ruta del archivo
+    # (obligatoria, en un directorio de la aplicación) o la URL de Redis y CACHE_SERIALIZER
+    # el formato de los backends compartidos: pickle solo si nadie más puede escribir el
+    # almacén, json en otro caso
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_URL = os.environ.get('CACHE_URL')
+    CACHE_SERIALIZER = os.environ.get('CACHE_SERIALIZER', 'pickle')
+    # Límites del caché (services.cache_manager): entradas, bytes aproximados
+    # y segundos entre barridos de entradas vencidas
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+    CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    CACHE_SWEEP_INTERVAL = int(os.environ.get('CACHE_SWEEP_INTERVAL', 60))
+    # Snapshot en disco de los catálogos del ERP (services.catalog_snapshot): archivo en un
+    # directorio de la aplicación (vacío = desactivado), segundos entre escrituras y edad
+    # máxima para usarlo al arrancar. Se firma con SECRET_KEY
+    CACHE_SNAPSHOT_PATH = os.environ.get('CACHE_SNAPSHOT_PATH', '')
+    CACHE_SNAPSHOT_INTERVAL = int(os.environ.get('CACHE_SNAPSHOT_INTERVAL', 300))
+    CACHE_SNAPSHOT_MAX_AGE = int(os.environ.get('CACHE_SNAPSHOT_MAX_AGE', 7 * 24 * 3600))
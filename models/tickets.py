@@ -1,7 +1,9 @@
 from datetime import datetime
+import unicodedata
 from flask_login import UserMixin
 import pytz
-from sqlalchemy import case
+from sqlalchemy import case, event
+from sqlalchemy.orm import validates
 from . import db
 from models.problemsTickets import Problems_tickets
 from models.sparesTickets import Spares_tickets
@@ -17,23 +19,63 @@ def get_colombia_utc_now():
     return hora_colombia.astimezone(pytz.UTC).replace(tzinfo=None)
 
 
+# Fecha de actividad de los tickets que no tienen ninguna fecha registrada
+ACTIVITY_FLOOR = datetime(1900, 1, 1)
+
+
+def normalize_document(document):
+    """
+    Normaliza un documento dejando solo letras y números
+    (ej. "1.020.345-6" -> "10203456")
+    """
+    if not document:
+        return ""
+    return ''.join(c for c in str(document) if c.isalnum())
+
+
+def normalize_text(value):
+    """
+    Normaliza un texto para compararlo sin distinguir mayúsculas ni tildes
+    (ej. "  Medellín " -> "medellin", "BOGOTÁ D.C." -> "bogota d.c.")
+    """
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    without_accents = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(without_accents.lower().split())
+
+
 class Tickets(db.Model, UserMixin):
     __bind_key__ = "db4"
     __tablename__ = "Tickets"
-    __table_args__ = {"schema": "plan_beneficios"}
+    __table_args__ = (
+        # Búsquedas de la vista del técnico: sus tickets abiertos
+        db.Index("idx_tickets_technician_state", "technical_document_normalized", "state"),
+        # Filtros por ciudad, técnico y referencia sin tildes (igualdad o prefijo)
+        db.Index("idx_tickets_type_city_normalized", "type_of_service", "city_normalized"),
+        db.Index("idx_tickets_technical_name_normalized", "technical_name_normalized"),
+        db.Index("idx_tickets_reference_normalized", "reference_normalized"),
+        {"schema": "plan_beneficios"},
+    )
 
     id_ticket = db.Column(db.Integer, primary_key=True, autoincrement=True)
     state = db.Column(db.String(50), nullable=False)
     priority = db.Column(db.String(50), nullable=False)
     technical_name = db.Column(db.String(33), nullable=False)
+    # Copias sin tildes ni mayúsculas (se mantienen en validate_normalized_text)
+    technical_name_normalized = db.Column(db.String(33), nullable=True)
     technical_document = db.Column(db.String(11), nullable=False)
+    # Copia normalizada de technical_document (se mantiene en validate_technical_document)
+    technical_document_normalized = db.Column(db.String(11), nullable=True)
     document_client = db.Column(db.String(11), nullable=False)
     product_code = db.Column(db.String(50), nullable=False)
     IMEI = db.Column(db.String(20), nullable=False)
     comment = db.Column(db.String(250), nullable=True)
     reference = db.Column(db.String(100), nullable=False)
+    reference_normalized = db.Column(db.String(100), nullable=True)
     type_of_service = db.Column(db.String(100), nullable=False)
     city = db.Column(db.String(15), nullable=False)
+    city_normalized = db.Column(db.String(15), nullable=True)
     invoice_number = db.Column(db.String(25), nullable=True)
     creation_date = db.Column(
         db.DateTime, nullable=True, default=get_colombia_utc_now)
@@ -41,6 +83,9 @@ class Tickets(db.Model, UserMixin):
     in_progress = db.Column(db.DateTime, nullable=True)
     in_revision = db.Column(db.DateTime, nullable=True)
     finished = db.Column(db.DateTime, nullable=True)
+    # Fecha de actividad más reciente persistida (la mantienen update_state y
+    # _sync_last_activity); los listados ordenan por ella usando idx_tickets_type_last_activity
+    last_activity = db.Column(db.DateTime, nullable=False)
     spare_value = db.Column(db.Numeric(12, 2), nullable=True, default=0.0)
     service_value = db.Column(db.Numeric(12, 2), nullable=True, default=0.0)
     discounted_value = db.Column(db.Numeric(12, 2), nullable=True, default=0.0)
@@ -52,6 +97,18 @@ class Tickets(db.Model, UserMixin):
                                backref=db.backref("tickets", lazy="dynamic"),
                                lazy="dynamic")
 
+    @validates("technical_document")
+    def validate_technical_document(self, key, value):
+        """Mantiene technical_document_normalized al asignar el documento del técnico"""
+        self.technical_document_normalized = normalize_document(value)
+        return value
+
+    @validates("city", "technical_name", "reference")
+    def validate_normalized_text(self, key, value):
+        """Mantiene la copia normalizada (<campo>_normalized) de ciudad, técnico y referencia"""
+        setattr(self, f"{key}_normalized", normalize_text(value))
+        return value
+
     def get_spare_parts(self):
         spare_tickets = Spares_tickets.query.filter_by(
             id_ticket=self.id_ticket).all()
@@ -77,14 +134,50 @@ class Tickets(db.Model, UserMixin):
         elif new_state == "Terminado":
             self.finished = now
         
+        self.last_activity = self.compute_last_activity()
         return now
 
+    def compute_last_activity(self):
+        """Calcula la fecha de actividad más reciente a partir de las fechas del ticket"""
+        return (self.finished or self.in_revision or self.in_progress
+                or self.assigned or self.creation_date or ACTIVITY_FLOOR)
+
+    def get_latest_activity(self):
+        """Fecha de actividad más reciente del ticket (valor de get_activity_expression)"""
+        return self.last_activity or self.compute_last_activity()
+
+    @classmethod
+    def get_activity_expression(cls):
+        """
+        Expresión SQL (sin dirección de orden) de la fecha de actividad más reciente.
+        Es la columna persistida last_activity, así los listados se sirven desde
+        idx_tickets_type_last_activity sin evaluar un CASE ni ordenar.
+        """
+        return cls.last_activity
+
+    @classmethod
+    def get_activity_case_expression(cls):
+        """
+        Misma fecha calculada con un CASE sobre las columnas de fechas
+        (la usa el backfill de last_activity). Nunca es NULL: un ticket sin
+        fechas toma ACTIVITY_FLOOR.
+        """
+        return case(
+            (cls.finished.isnot(None), cls.finished),
+            (cls.in_revision.isnot(None), cls.in_revision),
+            (cls.in_progress.isnot(None), cls.in_progress),
+            (cls.assigned.isnot(None), cls.assigned),
+            (cls.creation_date.isnot(None), cls.creation_date),
+            else_=ACTIVITY_FLOOR
+        )
+
     @classmethod
     def get_latest_activity_expression(cls):
         """
-        Genera una expresión SQL que calcula la fecha de actividad más reciente del ticket.
+        Genera una expresión SQL de orden por la fecha de actividad más reciente del ticket
+        (columna last_activity, DESC).
         
-        Considera las siguientes fechas en orden de prioridad:
+        last_activity considera las siguientes fechas en orden de prioridad:
         1. finished (fecha de finalización)
         2. in_revision (fecha de revisión)  
         3. in_progress (fecha de progreso)
@@ -94,10 +187,28 @@ class Tickets(db.Model, UserMixin):
         Returns:
             Expresión SQL para usar en order_by()
         """
-        return case(
-            (cls.finished.isnot(None), cls.finished),
-            (cls.in_revision.isnot(None), cls.in_revision),
-            (cls.in_progress.isnot(None), cls.in_progress),
-            (cls.assigned.isnot(None), cls.assigned),
-            else_=cls.creation_date
-        ).desc()
+        return cls.get_activity_expression().desc()
+
+
+# Listados por tipo ordenados por actividad (keyset sobre last_activity, id_ticket)
+db.Index(
+    "idx_tickets_type_last_activity",
+    Tickets.type_of_service, Tickets.last_activity.desc(), Tickets.id_ticket.desc()
+)
+
+
+@event.listens_for(Tickets, "before_insert")
+def _init_last_activity(mapper, connection, target):
+    """Calcula last_activity al crear el ticket"""
+    if target.creation_date is None:
+        # El default de creation_date se aplicaría en el INSERT; se adelanta para calcular la actividad
+        target.creation_date = get_colombia_utc_now()
+    target.last_activity = target.compute_last_activity()
+
+
+@event.listens_for(Tickets, "before_update")
+def _sync_last_activity(mapper, connection, target):
+    """Mantiene last_activity cuando alguna fecha se modifica fuera de update_state"""
+    last_activity = target.compute_last_activity()
+    if target.last_activity != last_activity:
+        target.last_activity = last_activity
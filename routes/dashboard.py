@@ -1,7 +1,11 @@
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, render_template, jsonify, request
+from flask_login import login_required
 
 dashboard_bp = Blueprint("dashboard", __name__, template_folder="templates")
 
+# Máximo de claves por respuesta de /dashboard/cache_metrics
+MAX_METRICS_KEYS = 500
+
 @dashboard_bp.route("/dashboard", endpoint="dashboard")
 def dashboard():
     # Datos mock para el dashboard
@@ -28,3 +32,14 @@ def get_dashboard_metrics():
         "state_distribution": {"Pendiente": 3, "Terminado": 2},
         "type_distribution": {"ST": 10, "RI": 5, "GA": 5},
     })
+
+@dashboard_bp.route("/dashboard/cache_metrics", methods=["GET"])
+@login_required
+def get_cache_metrics():
+    """
+    Métricas del caché (globales y por clave) para ajustar los TTL.
+    ?keys=N limita las claves con métricas propias (máximo MAX_METRICS_KEYS).
+    """
+    from services.cache_manager import get_cache_manager, DEFAULT_STATS_KEYS
+    max_keys = min(request.args.get("keys", DEFAULT_STATS_KEYS, type=int), MAX_METRICS_KEYS)
+    return jsonify(get_cache_manager().get_stats(max_keys=max_keys))
@@ -16,6 +16,7 @@ from models import db
 from models.problems import Problems
 from models.sparesTickets import Spares_tickets
 from routes.onedrive import refresh_token, get_ticket_images, delete_onedrive_images
+from services.single_flight import SingleFlight
 from utils.access_control import role_required
 from flask_login import login_required
 from services.pagination_service import get_paginated_technical_service
@@ -232,6 +233,41 @@ def search_products():
     
     return jsonify({'products': filtered_products})
 
+# Coalescencia de las búsquedas de repuestos por término
+_spare_parts_flight = SingleFlight('search_spare_parts')
+
+
+def _query_spare_parts(search_term):
+    """Consulta los repuestos de la línea ST que coinciden con el término (máximo 30)"""
+    query = '''
+    SELECT CODIGO, DESCRIPCIO
+    FROM MTMERCIA
+    WHERE CODLINEA = 'ST' AND 
+    (LOWER(CODIGO) LIKE ? OR LOWER(DESCRIPCIO) LIKE ?)
+    ORDER BY 
+        CASE 
+            WHEN LOWER(CODIGO) = ? THEN 1
+            WHEN LOWER(CODIGO) LIKE ? THEN 2
+            WHEN LOWER(DESCRIPCIO) = ? THEN 3
+            WHEN LOWER(DESCRIPCIO) LIKE ? THEN 4
+            ELSE 5
+        END
+    '''
+    
+    results = execute_query(query, (f'%{search_term}%', f'%{search_term}%', search_term, f'{search_term}%', search_term, f'{search_term}%'))
+    
+    spare_parts = []
+    for row in results:
+        if len(spare_parts) >= 30:
+            break
+            
+        spare_parts.append({
+            "code": row[0].strip() if row[0] else "",
+            "description": row[1].strip() if row[1] else ""
+        })
+    return spare_parts
+
+
 # Ruta original para búsqueda de repuestos (para compatibilidad)
 @technical_service_bp.route("/search_spare_parts", methods=["POST"])
 def search_spare_parts_original():
@@ -249,33 +285,8 @@ def search_spare_parts_original():
         }), 400
     
     try:
-        # Usar la misma lógica que en la nueva implementación
-        query = '''
-        SELECT CODIGO, DESCRIPCIO
-        FROM MTMERCIA
-        WHERE CODLINEA = 'ST' AND 
-        (LOWER(CODIGO) LIKE ? OR LOWER(DESCRIPCIO) LIKE ?)
-        ORDER BY 
-            CASE 
-                WHEN LOWER(CODIGO) = ? THEN 1
-                WHEN LOWER(CODIGO) LIKE ? THEN 2
-                WHEN LOWER(DESCRIPCIO) = ? THEN 3
-                WHEN LOWER(DESCRIPCIO) LIKE ? THEN 4
-                ELSE 5
-            END
-        '''
-        
-        results = execute_query(query, (f'%{search_term}%', f'%{search_term}%', search_term, f'{search_term}%', search_term, f'{search_term}%'))
-        
-        spare_parts = []
-        for row in results:
-            if len(spare_parts) >= 30:
-                break
-                
-            spare_parts.append({
-                "code": row[0].strip() if row[0] else "",
-                "description": row[1].strip() if row[1] else ""
-            })
+        # Búsquedas idénticas simultáneas comparten una sola consulta al ERP
+        spare_parts = _spare_parts_flight.do(search_term, lambda: _query_spare_parts(search_term))
         
         if not spare_parts:
             return jsonify({
@@ -299,13 +310,47 @@ def search_spare_parts_original():
         }), 500
 
 
+@technical_service_bp.route("/suggest_tickets", methods=["GET"])
+def suggest_tickets():
+    """
+    Sugerencias mientras se escribe (IMEI, documento, referencia, código de producto).
+    Se resuelven con los tries en memoria; la búsqueda completa solo corre al enviar.
+    Acepta un campo explícito: ?q=imei:3567
+    ready=false indica que el índice aún se está construyendo (las sugerencias llegan vacías).
+    """
+    from services.prefix_trie import get_suggestion_index, resolve_suggestion_field, DEFAULT_SUGGESTION_LIMIT
+    
+    query = request.args.get("q", "").strip()
+    ticket_type = request.args.get("type") or None
+    limit = min(request.args.get("limit", DEFAULT_SUGGESTION_LIMIT, type=int), 50)
+    
+    field = None
+    if ":" in query:
+        field_name, _, prefix = query.partition(":")
+        field = resolve_suggestion_field(field_name)
+        if field is None:
+            return jsonify({"status": "success", "suggestions": []})
+        query = prefix.strip('"').strip()
+    
+    if len(query) < 2:
+        return jsonify({"status": "success", "suggestions": []})
+    
+    index = get_suggestion_index()
+    suggestions = index.suggest(query, field=field, ticket_type=ticket_type, limit=limit)
+    return jsonify({"status": "success", "suggestions": suggestions, "ready": index.ready})
+
+
 @technical_service_bp.route("/search_tickets", methods=["POST"])
 def search_tickets():
     """
-    Endpoint para búsqueda completa de tickets de servicio técnico sin limitaciones de paginado
+    Endpoint para búsqueda completa de tickets de servicio técnico sin limitaciones de paginado.
+    Con stream=1 (o un cursor) retorna un bloque de resultados y el cursor del siguiente;
+    el primer bloque se sirve desde el caché de búsquedas. Esa respuesta no incluye
+    summary: contar por estado, prioridad y ciudad exige leer todas las coincidencias.
     """
     try:
         search_term = request.form.get("search", "").strip()
+        cursor = request.form.get("cursor") or None
         
         # Validar término de búsqueda
         from apps.tickets.services.search_service import SearchService
@@ -317,9 +362,32 @@ def search_tickets():
                 "message": validation['message']
             })
         
-        # Realizar búsqueda
-        tickets = SearchService.search_technical_service(search_term)
-        summary = SearchService.get_search_summary(search_term, ticket_type="0")
+        if request.form.get("stream") == "1" or cursor:
+            try:
+                tickets, next_cursor = SearchService.search_chunk(
+                    search_term, ticket_type="0", cursor=cursor
+                )
+            except ValueError as e:
+                return jsonify({"status": "error", "message": str(e)})
+            
+            # Un bloque siguiente vacío no debe pintar la fila de "sin resultados"
+            html_content = render_template(
+                'partials/tickets_table_rows.html',
+                tickets=tickets
+            ) if tickets or not cursor else ""
+            
+            return jsonify({
+                "status": "success",
+                "html": html_content,
+                "loaded_results": len(tickets),
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None,
+                "search_term": search_term,
+                "message": f"Resultados para '{search_term}'"
+            })
+        
+        # Realizar búsqueda y resumen en una sola consulta
+        tickets, summary = SearchService.search_with_summary(search_term, ticket_type="0")
         
         # Renderizar plantilla parcial con los resultados
         html_content = render_template(
@@ -0,0 +1,26 @@
+-- ========================================
+-- 🕒 ACTIVIDAD MÁS RECIENTE PERSISTIDA
+-- Los listados ordenan por last_activity desde el índice, en vez de evaluar
+-- un CASE de cinco ramas por fila y ordenar el resultado
+-- ========================================
+
+-- 1. Columna (nula mientras se ejecuta el backfill)
+ALTER TABLE plan_beneficios."Tickets"
+ADD COLUMN IF NOT EXISTS last_activity TIMESTAMP;
+
+-- 2. Backfill por bloques (transacciones cortas):
+--      python scripts/backfill_last_activity.py
+--    Equivale a:
+--      UPDATE plan_beneficios."Tickets"
+--      SET last_activity = COALESCE(finished, in_revision, in_progress, assigned, creation_date, '1900-01-01')
+--      WHERE last_activity IS NULL;
+
+-- 3. Una vez completo el backfill
+ALTER TABLE plan_beneficios."Tickets"
+ALTER COLUMN last_activity SET NOT NULL;
+
+-- 4. Índice de los listados: tipo + actividad DESC + id (desempate del cursor)
+CREATE INDEX IF NOT EXISTS idx_tickets_type_last_activity
+ON plan_beneficios."Tickets"(type_of_service, last_activity DESC, id_ticket DESC);
+
+ANALYZE plan_beneficios."Tickets";
@@ -0,0 +1,37 @@
+-- ========================================
+-- 🔤 CIUDAD, TÉCNICO Y REFERENCIA NORMALIZADOS
+-- Copias sin tildes ni mayúsculas para filtrar con igualdad o prefijo
+-- (usa índice) en vez de LOWER(city) LIKE '%medell%' (recorre la tabla)
+-- ========================================
+
+-- 1. Columnas normalizadas
+ALTER TABLE plan_beneficios."Tickets"
+ADD COLUMN IF NOT EXISTS city_normalized VARCHAR(15),
+ADD COLUMN IF NOT EXISTS technical_name_normalized VARCHAR(33),
+ADD COLUMN IF NOT EXISTS reference_normalized VARCHAR(100);
+
+-- 2. Backfill de los tickets existentes
+-- (los nuevos tickets las mantienen desde Tickets.validate_normalized_text,
+-- con la misma regla que models.tickets.normalize_text)
+UPDATE plan_beneficios."Tickets"
+SET city_normalized = regexp_replace(btrim(translate(lower(city),
+        'áàäâãéèëêíìïîóòöôõúùüûñç', 'aaaaaeeeeiiiiooooouuuunc')), '\s+', ' ', 'g'),
+    technical_name_normalized = regexp_replace(btrim(translate(lower(technical_name),
+        'áàäâãéèëêíìïîóòöôõúùüûñç', 'aaaaaeeeeiiiiooooouuuunc')), '\s+', ' ', 'g'),
+    reference_normalized = regexp_replace(btrim(translate(lower(reference),
+        'áàäâãéèëêíìïîóòöôõúùüûñç', 'aaaaaeeeeiiiiooooouuuunc')), '\s+', ' ', 'g')
+WHERE city_normalized IS NULL
+   OR technical_name_normalized IS NULL
+   OR reference_normalized IS NULL;
+
+-- 3. Índices (varchar_pattern_ops resuelve tanto la igualdad como LIKE 'prefijo%')
+CREATE INDEX IF NOT EXISTS idx_tickets_type_city_normalized
+ON plan_beneficios."Tickets"(type_of_service, city_normalized varchar_pattern_ops);
+
+CREATE INDEX IF NOT EXISTS idx_tickets_technical_name_normalized
+ON plan_beneficios."Tickets"(technical_name_normalized varchar_pattern_ops);
+
+CREATE INDEX IF NOT EXISTS idx_tickets_reference_normalized
+ON plan_beneficios."Tickets"(reference_normalized varchar_pattern_ops);
+
+ANALYZE plan_beneficios."Tickets";
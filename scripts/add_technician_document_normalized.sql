@@ -0,0 +1,21 @@
+-- ========================================
+-- 🔧 DOCUMENTO NORMALIZADO DEL TÉCNICO
+-- Permite filtrar en SQL los tickets de un técnico (vista del técnico)
+-- sin normalizar technical_document en Python fila por fila
+-- ========================================
+
+-- 1. Columna con el documento sin puntos, guiones ni espacios
+ALTER TABLE plan_beneficios."Tickets"
+ADD COLUMN IF NOT EXISTS technical_document_normalized VARCHAR(11);
+
+-- 2. Backfill de los tickets existentes
+-- (los nuevos tickets la mantienen desde Tickets.validate_technical_document)
+UPDATE plan_beneficios."Tickets"
+SET technical_document_normalized = regexp_replace(technical_document, '[^[:alnum:]]', '', 'g')
+WHERE technical_document_normalized IS NULL;
+
+-- 3. Índice para SearchService.search_technician_tickets (técnico + estado)
+CREATE INDEX IF NOT EXISTS idx_tickets_technician_state
+ON plan_beneficios."Tickets"(technical_document_normalized, state);
+
+ANALYZE plan_beneficios."Tickets";
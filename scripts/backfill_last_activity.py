@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+🕒 BACKFILL DE last_activity
+Calcula la fecha de actividad más reciente de los tickets existentes por bloques de id_ticket,
+con el mismo criterio que Tickets.compute_last_activity (finished, in_revision,
+in_progress, assigned, creation_date).
+
+Uso:
+    python scripts/backfill_last_activity.py [tamaño_de_bloque]
+
+Se puede ejecutar varias veces: solo actualiza los tickets con last_activity en NULL.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Agregar el directorio del proyecto al path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def backfill_last_activity(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Llena last_activity en bloques de id_ticket (una transacción corta por bloque)
+
+    Returns:
+        int: Tickets actualizados
+    """
+    from sqlalchemy import func, update
+    from models import db
+    from models.tickets import Tickets
+
+    min_id, max_id = db.session.query(
+        func.min(Tickets.id_ticket), func.max(Tickets.id_ticket)
+    ).filter(Tickets.last_activity.is_(None)).one()
+
+    if min_id is None:
+        print("✅ Todos los tickets ya tienen last_activity")
+        return 0
+
+    updated = 0
+    for start in range(min_id, max_id + 1, batch_size):
+        end = start + batch_size
+        result = db.session.execute(
+            update(Tickets)
+            .where(
+                Tickets.id_ticket >= start,
+                Tickets.id_ticket < end,
+                Tickets.last_activity.is_(None)
+            )
+            .values(last_activity=Tickets.get_activity_case_expression())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        updated += result.rowcount
+        print(f"  [{start}-{end - 1}] {result.rowcount} tickets actualizados")
+
+    return updated
+
+
+def main():
+    from flask import Flask
+    from models import db
+
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BATCH_SIZE
+
+    # Aplicación mínima: solo la configuración de base de datos (sin construir índices de búsqueda)
+    app = Flask(__name__)
+    app.config.from_object('config.Config')
+    db.init_app(app)
+
+    print("🕒 INICIANDO BACKFILL DE last_activity...")
+    print("=" * 60)
+
+    with app.app_context():
+        try:
+            start_time = time.time()
+            updated = backfill_last_activity(batch_size)
+            print(f"✅ {updated} tickets actualizados en {time.time() - start_time:.2f}s")
+            return True
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error en backfill de last_activity: {e}")
+            return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -25,12 +25,16 @@ class PerformanceMonitor:
             cache = get_cache_manager()
             stats = cache.get_stats()
             
+            # Eficiencia = porcentaje de lecturas servidas desde el caché
             return {
                 'status': 'OK',
                 'cache_entries': stats['total_entries'],
                 'active_entries': stats['active_entries'],
                 'expired_entries': stats['expired_entries'],
-                'efficiency': round((stats['active_entries'] / max(stats['total_entries'], 1)) * 100, 2)
+                'hits': stats['hits'],
+                'misses': stats['misses'],
+                'evictions': stats['evictions'],
+                'efficiency': round(stats['hit_rate'] * 100, 2)
             }
         except Exception as e:
             return {
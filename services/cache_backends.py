@@ -0,0 +1,706 @@
+"""
+Almacenes de entradas para CacheManager
+El gestor decide qué está fresco, cuándo recargar y qué medir; el backend solo guarda
+las entradas y los contadores de generación. Con un backend compartido todos los
+workers del servidor ven las mismas entradas y las mismas invalidaciones.
+
+Backends disponibles (Config.CACHE_BACKEND):
+- memory: diccionario del proceso con LRU por entradas y bytes (por defecto)
+- sqlite: archivo SQLite compartido por los procesos del mismo servidor (Config.CACHE_URL)
+- redis:  servidor Redis (Config.CACHE_URL, requiere el paquete redis); la expiración
+          y el descarte los hace Redis (configurar maxmemory-policy allkeys-lru)
+
+Serialización de los backends compartidos (Config.CACHE_SERIALIZER): pickle o json.
+Leer pickle ejecuta código: solo es seguro si el almacén es privado de la aplicación
+(archivo SQLite del usuario del servidor, Redis sin acceso de terceros); si no, usar json.
+El archivo SQLite no tiene ruta por defecto: se crea con permisos 0600 en CACHE_URL y se
+rechaza si pertenece a otro usuario o si otros pueden escribirlo.
+
+Cada entrada puede llevar etiquetas (ej. 'search:0', 'catalog'); todos los backends
+mantienen un índice inverso etiqueta -> claves para que delete_tag elimine solo las
+entradas de esas etiquetas, sin recorrer todas las claves.
+"""
+import json
+import os
+import pickle
+import sqlite3
+import sys
+import stat
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Dict, List, Optional
+
+# Límites por defecto (Config.CACHE_MAX_ENTRIES / CACHE_MAX_BYTES)
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+DEFAULT_CACHE_BACKEND = 'memory'
+DEFAULT_SERIALIZER = 'pickle'
+
+# Elementos de una colección que se miden para estimar su tamaño
+SIZE_SAMPLE = 50
+SIZE_MAX_DEPTH = 4
+
+_SCALAR_TYPES = (str, bytes, bytearray, int, float, bool, type(None))
+
+
+def ensure_private_file(path):
+    """
+    Crea el archivo con permisos 0600 si no existe y verifica que sea de este usuario y que
+    nadie más pueda escribirlo (su contenido se deserializa al leerlo)
+
+    Raises:
+        PermissionError: Si el archivo pertenece a otro usuario o otros pueden escribirlo
+    """
+    descriptor = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        info = os.fstat(descriptor)
+    finally:
+        os.close(descriptor)
+    # En Windows no hay uid ni bits de grupo/otros que verificar
+    if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+        raise PermissionError(f"El archivo {path} pertenece a otro usuario")
+    if os.name == 'posix' and info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"Otros usuarios pueden escribir el archivo {path}")
+
+
+def approximate_size(value, _depth=0) -> int:
+    """
+    Tamaño aproximado en bytes de un valor cacheado.
+    Las colecciones grandes se estiman midiendo solo los primeros SIZE_SAMPLE elementos.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, _SCALAR_TYPES) or _depth >= SIZE_MAX_DEPTH:
+        return size
+
+    if isinstance(value, dict):
+        sample = list(islice(value.items(), SIZE_SAMPLE))
+        measured = sum(
+            approximate_size(k, _depth + 1) + approximate_size(v, _depth + 1) for k, v in sample
+        )
+        return size + (measured * len(value) // len(sample) if sample else 0)
+
+    if isinstance(value, (list, tuple, set, frozenset)):
+        sample = list(islice(value, SIZE_SAMPLE))
+        measured = sum(approximate_size(item, _depth + 1) for item in sample)
+        return size + (measured * len(value) // len(sample) if sample else 0)
+
+    # Objetos (modelos, filas): sus atributos, sin el estado interno de SQLAlchemy
+    attributes = getattr(value, '__dict__', None)
+    if attributes:
+        size += sum(
+            approximate_size(v, _depth + 1) for k, v in attributes.items() if not k.startswith('_sa_')
+        )
+    for slot in getattr(type(value), '__slots__', ()):
+        size += approximate_size(getattr(value, slot, None), _depth + 1)
+    return size
+
+
+class CacheEntry:
+    """Valor cacheado con el momento de carga, su TTL y su edad máxima (ttl o hard_ttl)"""
+
+    __slots__ = ('value', 'timestamp', 'ttl', 'max_age')
+
+    def __init__(self, value, timestamp, ttl, max_age=None):
+        self.value = value
+        self.timestamp = timestamp
+        self.ttl = ttl
+        self.max_age = ttl if max_age is None else max_age
+
+    def is_fresh(self, ttl, now) -> bool:
+        return now - self.timestamp < ttl
+
+    def is_expired(self, now) -> bool:
+        """Superó su edad máxima: ya no puede servirse ni como valor viejo"""
+        return now - self.timestamp >= self.max_age
+
+
+class PickleSerializer:
+    """Cualquier objeto de Python (incluye modelos y TicketRow)"""
+
+    name = 'pickle'
+
+    def dumps(self, value) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data: bytes):
+        return pickle.loads(data)
+
+
+class JsonSerializer:
+    """Solo datos simples (dict, list, str, números); legible desde otros lenguajes"""
+
+    name = 'json'
+
+    def dumps(self, value) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data: bytes):
+        return json.loads(data.decode('utf-8') if isinstance(data, bytes) else data)
+
+
+SERIALIZERS = {
+    PickleSerializer.name: PickleSerializer,
+    JsonSerializer.name: JsonSerializer,
+}
+
+
+class CacheBackend:
+    """Interfaz común de los almacenes del caché (todas las operaciones son thread-safe)"""
+
+    name = 'base'
+    shared = False
+
+    def get(self, key: str, now: float) -> Optional[CacheEntry]:
+        """Entrada de la clave, o None si no existe o superó su edad máxima"""
+        raise NotImplementedError
+
+    def set(self, key: str, entry: CacheEntry, tags=()):
+        """Guarda la entrada y la registra bajo sus etiquetas (reemplaza las anteriores)"""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def delete_tag(self, tags) -> List[str]:
+        """Elimina las entradas con alguna de las etiquetas; retorna sus claves"""
+        raise NotImplementedError
+
+    def delete_pattern(self, pattern: str) -> int:
+        """Elimina las claves que contienen el patrón (recorre todas); retorna cuántas"""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def sweep_expired(self, now: float) -> int:
+        """Elimina las entradas que superaron su edad máxima; retorna cuántas"""
+        return 0
+
+    def get_generation(self, name: str) -> int:
+        raise NotImplementedError
+
+    def bump_generation(self, name: str) -> int:
+        raise NotImplementedError
+
+    def get_generations(self, names) -> List[int]:
+        """Varios contadores de generación en una sola lectura (en el orden de names)"""
+        return [self.get_generation(name) for name in names]
+
+    def get_stats(self, now: float) -> Dict[str, Any]:
+        """
+        Returns:
+            dict con entries, expired_entries (según el TTL de cada una), keys, tags,
+            approx_bytes, evictions y expirations
+        """
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Diccionario del proceso acotado por entradas y bytes aproximados (LRU)"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        # Orden de uso: la primera clave es la usada hace más tiempo
+        self.entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self.expirations = 0
+        self.generations = {}
+        # Índice inverso etiqueta -> claves, y etiquetas de cada clave para limpiarlo
+        self.tags: Dict[str, set] = {}
+        self.key_tags: Dict[str, tuple] = {}
+        self.lock = threading.Lock()
+
+    def _remove(self, key):
+        if self.entries.pop(key, None) is not None:
+            self.total_bytes -= self.sizes.pop(key, 0)
+            for tag in self.key_tags.pop(key, ()):
+                keys = self.tags.get(tag)
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+    def get(self, key, now):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            # Expiración perezosa
+            if entry.is_expired(now):
+                self._remove(key)
+                self.expirations += 1
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, tags=()):
+        size = approximate_size(entry.value)
+        with self.lock:
+            self._remove(key)
+            self.entries[key] = entry
+            self.sizes[key] = size
+            self.total_bytes += size
+            if tags:
+                self.key_tags[key] = tuple(tags)
+                for tag in tags:
+                    self.tags.setdefault(tag, set()).add(key)
+
+            # La entrada recién guardada nunca se descarta, aunque sola exceda max_bytes
+            while len(self.entries) > 1 and (
+                len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self.lock:
+            self._remove(key)
+
+    def delete_tag(self, tags):
+        with self.lock:
+            keys_to_remove = set()
+            for tag in tags:
+                keys_to_remove.update(self.tags.get(tag, ()))
+            for key in keys_to_remove:
+                self._remove(key)
+            return list(keys_to_remove)
+
+    def delete_pattern(self, pattern):
+        with self.lock:
+            keys_to_remove = [k for k in self.entries if pattern in k]
+            for key in keys_to_remove:
+                self._remove(key)
+            return len(keys_to_remove)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.tags.clear()
+            self.key_tags.clear()
+            self.total_bytes = 0
+
+    def sweep_expired(self, now):
+        with self.lock:
+            expired = [key for key, entry in self.entries.items() if entry.is_expired(now)]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+            return len(expired)
+
+    def get_generation(self, name):
+        with self.lock:
+            return self.generations.get(name, 0)
+
+    def bump_generation(self, name):
+        with self.lock:
+            self.generations[name] = self.generations.get(name, 0) + 1
+            return self.generations[name]
+
+    def get_stats(self, now):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'expired_entries': sum(
+                    1 for entry in self.entries.values() if not entry.is_fresh(entry.ttl, now)
+                ),
+                'keys': list(self.entries),
+                'tags': len(self.tags),
+                'approx_bytes': self.total_bytes,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Archivo SQLite compartido por los workers del mismo servidor.
+    Cada hilo usa su propia conexión; el modo WAL permite leer mientras otro proceso escribe.
+    """
+
+    name = 'sqlite'
+    shared = True
+
+    # Solo se actualiza el último acceso (orden LRU) si cambió más que esto (segundos)
+    ACCESS_RESOLUTION = 5
+
+    # Versión del esquema del archivo (PRAGMA user_version); un archivo de otra versión se recrea
+    SCHEMA_VERSION = 2
+
+    def __init__(self, path, serializer=None,
+                 max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        if not path:
+            raise ValueError("El backend sqlite requiere CACHE_URL (ruta del archivo)")
+        ensure_private_file(path)
+        self.path = path
+        self.serializer = serializer or PickleSerializer()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self.expirations = 0
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self._setup()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    @staticmethod
+    @contextmanager
+    def _transaction(connection):
+        """BEGIN IMMEDIATE: las sentencias del bloque son atómicas entre procesos"""
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _setup(self):
+        with self._transaction(self._connection()) as connection:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != self.SCHEMA_VERSION:
+                # Solo es caché: las entradas de otra versión se descartan
+                connection.execute("DROP TABLE IF EXISTS cache_tags")
+                connection.execute("DROP TABLE IF EXISTS cache_entries")
+                connection.execute("DROP TABLE IF EXISTS cache_generations")
+                connection.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            self._create_tables(connection)
+
+    @staticmethod
+    def _create_tables(connection):
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                timestamp REAL NOT NULL,
+                ttl REAL NOT NULL,
+                max_age REAL NOT NULL,
+                serializer TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_entries_last_access ON cache_entries (last_access)"
+        )
+        # Índice inverso de etiquetas; el trigger lo limpia al eliminar, descartar o vencer entradas
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS cache_tags (
+                tag TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (tag, key)
+            ) WITHOUT ROWID
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_cache_tags_key ON cache_tags (key)")
+        connection.execute("""
+            CREATE TRIGGER IF NOT EXISTS cache_entries_delete_tags AFTER DELETE ON cache_entries
+            BEGIN
+                DELETE FROM cache_tags WHERE key = OLD.key;
+            END
+        """)
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS cache_generations (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+
+    def get(self, key, now):
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT value, timestamp, ttl, max_age, serializer, last_access FROM cache_entries WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, timestamp, ttl, max_age, serializer, last_access = row
+        if serializer != self.serializer.name:
+            # Guardada por un worker con otra Config.CACHE_SERIALIZER: se trata como fallo
+            return None
+        entry = CacheEntry(None, timestamp, ttl, max_age)
+        if entry.is_expired(now):
+            connection.execute(
+                "DELETE FROM cache_entries WHERE key = ? AND timestamp = ?", (key, timestamp)
+            )
+            with self.lock:
+                self.expirations += 1
+            return None
+
+        if now - last_access > self.ACCESS_RESOLUTION:
+            connection.execute("UPDATE cache_entries SET last_access = ? WHERE key = ?", (now, key))
+        entry.value = self.serializer.loads(value)
+        return entry
+
+    def set(self, key, entry, tags=()):
+        data = self.serializer.dumps(entry.value)
+        with self._transaction(self._connection()) as connection:
+            # INSERT OR REPLACE no dispara el trigger: las etiquetas anteriores se quitan aquí
+            connection.execute("DELETE FROM cache_tags WHERE key = ?", (key,))
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(key, value, timestamp, ttl, max_age, serializer, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, data, entry.timestamp, entry.ttl, entry.max_age, self.serializer.name,
+                 len(data), time.time())
+            )
+            if tags:
+                connection.executemany(
+                    "INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)", [(tag, key) for tag in tags]
+                )
+            self._evict(connection, key)
+
+    def _evict(self, connection, keep_key):
+        """Descarta las entradas con el acceso más antiguo mientras se excedan los límites"""
+        count, total_bytes = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries"
+        ).fetchone()
+        while count > 1 and (count > self.max_entries or total_bytes > self.max_bytes):
+            batch = max(count - self.max_entries, 1)
+            victims = connection.execute(
+                "SELECT key, size FROM cache_entries WHERE key != ? ORDER BY last_access LIMIT ?",
+                (keep_key, batch)
+            ).fetchall()
+            if not victims:
+                break
+            connection.executemany("DELETE FROM cache_entries WHERE key = ?", [(k,) for k, _ in victims])
+            count -= len(victims)
+            total_bytes -= sum(size for _, size in victims)
+            with self.lock:
+                self.evictions += len(victims)
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def delete_tag(self, tags):
+        tags = list(tags)
+        if not tags:
+            return []
+        placeholders = ', '.join('?' for _ in tags)
+        with self._transaction(self._connection()) as connection:
+            keys = [row[0] for row in connection.execute(
+                f"SELECT DISTINCT key FROM cache_tags WHERE tag IN ({placeholders})", tags
+            )]
+            connection.executemany("DELETE FROM cache_entries WHERE key = ?", [(key,) for key in keys])
+        return keys
+
+    def delete_pattern(self, pattern):
+        cursor = self._connection().execute(
+            "DELETE FROM cache_entries WHERE instr(key, ?) > 0", (pattern,)
+        )
+        return cursor.rowcount
+
+    def clear(self):
+        with self._transaction(self._connection()) as connection:
+            connection.execute("DELETE FROM cache_tags")
+            connection.execute("DELETE FROM cache_entries")
+
+    def sweep_expired(self, now):
+        cursor = self._connection().execute(
+            "DELETE FROM cache_entries WHERE ? - timestamp >= max_age", (now,)
+        )
+        with self.lock:
+            self.expirations += cursor.rowcount
+        return cursor.rowcount
+
+    def get_generation(self, name):
+        row = self._connection().execute(
+            "SELECT value FROM cache_generations WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_generations(self, names):
+        names = list(names)
+        placeholders = ', '.join('?' for _ in names)
+        values = dict(self._connection().execute(
+            f"SELECT name, value FROM cache_generations WHERE name IN ({placeholders})", names
+        ).fetchall())
+        return [values.get(name, 0) for name in names]
+
+    def bump_generation(self, name):
+        # El incremento y su lectura son atómicos entre procesos
+        with self._transaction(self._connection()) as connection:
+            connection.execute(
+                "INSERT OR IGNORE INTO cache_generations (name, value) VALUES (?, 0)", (name,)
+            )
+            connection.execute("UPDATE cache_generations SET value = value + 1 WHERE name = ?", (name,))
+            return connection.execute(
+                "SELECT value FROM cache_generations WHERE name = ?", (name,)
+            ).fetchone()[0]
+
+    def get_stats(self, now):
+        connection = self._connection()
+        count, expired, total_bytes = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(? - timestamp >= ttl), 0), COALESCE(SUM(size), 0) "
+            "FROM cache_entries", (now,)
+        ).fetchone()
+        keys = [row[0] for row in connection.execute("SELECT key FROM cache_entries ORDER BY last_access")]
+        tags = connection.execute("SELECT COUNT(DISTINCT tag) FROM cache_tags").fetchone()[0]
+        with self.lock:
+            return {
+                'entries': count,
+                'expired_entries': expired,
+                'keys': keys,
+                'tags': tags,
+                'approx_bytes': total_bytes,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Servidor Redis compartido por todos los workers (incluso de varios servidores).
+    Cada entrada expira en Redis al cumplir su edad máxima; el descarte por memoria
+    lo hace Redis según su maxmemory-policy. Cada etiqueta es un SET con sus claves que
+    vive tanto como su entrada más duradera (EXPIRE NX/GT, Redis 7).
+    """
+
+    name = 'redis'
+    shared = True
+
+    def __init__(self, url='redis://localhost:6379/0', serializer=None, prefix='tickets:cache:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("El backend de caché 'redis' requiere el paquete redis")
+
+        self.client = redis.Redis.from_url(url)
+        self.serializer = serializer or PickleSerializer()
+        self.prefix = prefix
+        self.generation_prefix = f"{prefix}generation:"
+        # El formato forma parte de la clave: workers con otra serialización no se leen entre sí
+        self.entry_prefix = f"{prefix}entry:{self.serializer.name}:"
+        self.tag_prefix = f"{prefix}tag:{self.serializer.name}:"
+
+    @staticmethod
+    def _escape_glob(pattern):
+        return ''.join(f"\\{char}" if char in '*?[]\\' else char for char in pattern)
+
+    def _scan(self, pattern='') -> List[bytes]:
+        match = f"{self.entry_prefix}*{self._escape_glob(pattern)}*"
+        return list(self.client.scan_iter(match=match, count=500))
+
+    def get(self, key, now):
+        data = self.client.get(self.entry_prefix + key)
+        if data is None:
+            return None
+        value, timestamp, ttl, max_age = self.serializer.loads(data)
+        entry = CacheEntry(value, timestamp, ttl, max_age)
+        return None if entry.is_expired(now) else entry
+
+    def set(self, key, entry, tags=()):
+        data = self.serializer.dumps([entry.value, entry.timestamp, entry.ttl, entry.max_age])
+        expires_in = max(int(entry.max_age - (time.time() - entry.timestamp)) + 1, 1)
+        pipeline = self.client.pipeline()
+        pipeline.set(self.entry_prefix + key, data, ex=expires_in)
+        for tag in tags:
+            # Las claves vencidas que queden en el SET solo cuestan un DEL sin efecto
+            pipeline.sadd(self.tag_prefix + tag, key)
+            pipeline.expire(self.tag_prefix + tag, expires_in, nx=True)
+            pipeline.expire(self.tag_prefix + tag, expires_in, gt=True)
+        pipeline.execute()
+
+    def delete(self, key):
+        self.client.delete(self.entry_prefix + key)
+
+    def delete_tag(self, tags):
+        tag_keys = [self.tag_prefix + tag for tag in tags]
+        if not tag_keys:
+            return []
+        pipeline = self.client.pipeline()
+        pipeline.sunion(tag_keys)
+        pipeline.delete(*tag_keys)
+        members = pipeline.execute()[0]
+        keys = [member.decode('utf-8') for member in members]
+        if keys:
+            self.client.delete(*[self.entry_prefix + key for key in keys])
+        return keys
+
+    def delete_pattern(self, pattern):
+        keys = self._scan(pattern)
+        if keys:
+            self.client.delete(*keys)
+        return len(keys)
+
+    def clear(self):
+        self.delete_pattern('')
+        tag_keys = list(self.client.scan_iter(match=f"{self.tag_prefix}*", count=500))
+        if tag_keys:
+            self.client.delete(*tag_keys)
+
+    def get_generation(self, name):
+        return int(self.client.get(self.generation_prefix + name) or 0)
+
+    def get_generations(self, names):
+        values = self.client.mget([self.generation_prefix + name for name in names])
+        return [int(value or 0) for value in values]
+
+    def bump_generation(self, name):
+        return int(self.client.incr(self.generation_prefix + name))
+
+    def get_stats(self, now):
+        keys = [key.decode('utf-8')[len(self.entry_prefix):] for key in self._scan()]
+        memory = self.client.info('memory')
+        return {
+            'entries': len(keys),
+            'expired_entries': 0,
+            'keys': keys,
+            'tags': sum(1 for _ in self.client.scan_iter(match=f"{self.tag_prefix}*", count=500)),
+            'approx_bytes': memory.get('used_memory', 0),
+            'evictions': int(self.client.info('stats').get('evicted_keys', 0)),
+            'expirations': int(self.client.info('stats').get('expired_keys', 0)),
+        }
+
+
+CACHE_BACKENDS = {
+    MemoryCacheBackend.name: MemoryCacheBackend,
+    SQLiteCacheBackend.name: SQLiteCacheBackend,
+    RedisCacheBackend.name: RedisCacheBackend,
+}
+
+
+def create_cache_backend(name=DEFAULT_CACHE_BACKEND, url=None, serializer=DEFAULT_SERIALIZER,
+                         max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES) -> CacheBackend:
+    """
+    Crea el backend configurado. Si no puede prepararse se usa el de memoria.
+
+    Args:
+        name: memory, sqlite o redis
+        url: Ruta del archivo SQLite (obligatoria) o URL de Redis (None = localhost)
+        serializer: pickle o json (solo backends compartidos)
+        max_entries: Máximo de entradas (memory y sqlite)
+        max_bytes: Máximo de bytes aproximados (memory y sqlite)
+    """
+    name = str(name or DEFAULT_CACHE_BACKEND).lower()
+    try:
+        serializer_class = SERIALIZERS.get(str(serializer).lower())
+        if serializer_class is None:
+            raise ValueError(f"Serialización de caché desconocida: {serializer}")
+
+        if name == MemoryCacheBackend.name:
+            return MemoryCacheBackend(max_entries, max_bytes)
+        if name == SQLiteCacheBackend.name:
+            return SQLiteCacheBackend(url, serializer_class(), max_entries, max_bytes)
+        if name == RedisCacheBackend.name:
+            return RedisCacheBackend(url or 'redis://localhost:6379/0', serializer_class())
+        raise ValueError(f"Backend de caché desconocido: {name}")
+    except Exception as e:
+        print(f"Error inicializando backend de caché '{name}': {e}")
+        return MemoryCacheBackend(max_entries, max_bytes)
@@ -1,102 +1,517 @@
 """
 Sistema de caché para datos estáticos del sistema de tickets
 Reduce consultas repetitivas a la base de datos
+
+Cada entrada tiene un TTL suave (ttl) y opcionalmente uno duro (hard_ttl): entre
+ambos se sirve el valor viejo al instante y un hilo en segundo plano lo recarga
+(stale-while-revalidate); solo después del TTL duro la petición espera la consulta.
+
+Las entradas y los contadores de generación se guardan en un backend
+(services/cache_backends.py, Config.CACHE_BACKEND): en memoria del proceso, acotado
+por entradas y bytes aproximados (LRU), o compartido entre los workers (SQLite, Redis)
+para que una invalidación en un worker valga en todos. Las entradas vencidas se
+eliminan al leerlas y, las que nadie vuelve a leer, con un barrido periódico.
+
+Las entradas se guardan con etiquetas (ej. 'search:0' para las búsquedas de un tipo,
+CATALOG_TAG para los catálogos) e invalidate_tag elimina exactamente las entradas de
+esas etiquetas con el índice inverso del backend, sin recorrer todas las claves.
+
+Con un backend compartido, las claves de L1_KEYS (catálogos que se leen en casi todas
+las páginas) se guardan además en un L1 del proceso: cada lectura compara un sello de
+versión del backend (un entero) con el del L1 y, si coincide, devuelve el objeto ya
+deserializado. Toda escritura o invalidación de esas claves cambia el sello, así los
+demás workers descartan su copia en la siguiente lectura.
 """
+import hashlib
 import time
 import threading
+from collections import OrderedDict
 from typing import Any, Optional, Dict, Callable
 
+from flask import current_app, has_app_context
+
+from services.cache_backends import (
+    CacheBackend, CacheEntry, MemoryCacheBackend, create_cache_backend,
+    DEFAULT_CACHE_BACKEND, DEFAULT_SERIALIZER, DEFAULT_MAX_ENTRIES, DEFAULT_MAX_BYTES
+)
+from services.single_flight import SingleFlight
+
+# Intervalo por defecto del barrido (Config.CACHE_SWEEP_INTERVAL)
+DEFAULT_SWEEP_INTERVAL = 60
+
+# Máximo de claves con métricas propias en get_stats (las más recientes)
+DEFAULT_STATS_KEYS = 100
+
+# Claves que se copian en el L1 del proceso (ver get_cached_technicians / get_cached_problems)
+L1_KEYS = frozenset({'technicians', 'problems'})
+L1_MAX_ENTRIES = 64
+
+# Sello de versión que invalida todo el L1 (clear, invalidate_pattern)
+_L1_VERSION_ALL = 'l1:all'
+
+# Etiqueta de los catálogos (ver invalidate_static_data)
+CATALOG_TAG = 'catalog'
+
+# Catálogos del ERP: clave -> (ttl, hard_ttl) en segundos (ver get_cached_* y catalog_snapshot)
+CATALOG_TTLS = {
+    'technicians': (600, 3600),
+    'product_information': (1800, 21600),
+    'spare_parts': (1800, 21600),
+    'spare_name': (1800, 21600),
+    'sertec': (3600, 43200),
+}
+
+
+class _KeyMetrics:
+    """Contadores de una clave del caché"""
+
+    __slots__ = ('hits', 'misses', 'stale_hits', 'loads', 'load_failures',
+                 'load_time_total', 'last_load_time', 'last_loaded_at')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.loads = 0
+        self.load_failures = 0
+        self.load_time_total = 0.0
+        self.last_load_time = None
+        self.last_loaded_at = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        requests = self.hits + self.misses
+        attempts = self.loads + self.load_failures
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale_hits': self.stale_hits,
+            'hit_rate': round(self.hits / requests, 4) if requests else 0.0,
+            'loads': self.loads,
+            'load_failures': self.load_failures,
+            'load_time_total': round(self.load_time_total, 4),
+            'avg_load_time': round(self.load_time_total / attempts, 4) if attempts else None,
+            'last_load_time': None if self.last_load_time is None else round(self.last_load_time, 4),
+            'last_loaded_at': self.last_loaded_at,
+        }
+
+
 class CacheManager:
-    def __init__(self, default_ttl=300):  # 5 minutos por defecto
-        self.cache = {}
-        self.timestamps = {}
+    def __init__(self, default_ttl=300, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES, sweep_interval=DEFAULT_SWEEP_INTERVAL,
+                 backend: Optional[CacheBackend] = None, l1_keys=()):  # 5 minutos por defecto
+        # Almacén de las entradas y generaciones (en memoria si no se indica otro)
+        self.backend = backend or MemoryCacheBackend(max_entries, max_bytes)
+        # L1: clave -> (sello de versión, CacheEntry); solo tiene sentido si el backend es compartido
+        self.l1_keys = frozenset(l1_keys) if self.backend.shared else frozenset()
+        self.l1 = OrderedDict()
+        self.l1_hits = 0
+        self.l1_misses = 0
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._sweeper = None
+        self._sweeper_stop = threading.Event()
         self.lock = threading.Lock()
         self.default_ttl = default_ttl
-    
-    def get(self, key: str, fetch_function: Callable = None, ttl: Optional[int] = None) -> Any:
+        # Aciertos/fallos por espacio de nombres (prefijo de la clave antes de ':')
+        self.hits = {}
+        self.misses = {}
+        # Cargas en curso por clave: self.lock nunca se mantiene durante fetch_function
+        self.loads = SingleFlight('cache_loads')
+        # Claves con una recarga en segundo plano pendiente
+        self.refreshing = set()
+        self.stale_hits = 0
+        self.background_refreshes = 0
+        self.background_failures = 0
+        self.store_failures = 0
+        # Métricas por clave (acotadas a max_entries claves, las usadas hace más tiempo se descartan)
+        self.key_metrics = OrderedDict()
+
+    def get(self, key: str, fetch_function: Callable = None, ttl: Optional[int] = None,
+            hard_ttl: Optional[int] = None, tags=()) -> Any:
         """
         Obtiene un valor del caché o lo calcula usando la función proporcionada
-        
+
         Args:
             key: Clave del caché
             fetch_function: Función para obtener el dato si no está en caché
             ttl: Tiempo de vida en segundos (usa default_ttl si no se especifica)
-        
+            hard_ttl: Edad máxima en segundos de un valor viejo que todavía se sirve
+                mientras se recarga en segundo plano (None = igual a ttl, sin recarga)
+            tags: Etiquetas con que se guarda el valor calculado (ver invalidate_tag)
+
         Returns:
             El valor cacheado o recién calculado
         """
         if ttl is None:
             ttl = self.default_ttl
-        
-        current_time = time.time()
-        
+
+        namespace = self._namespace(key)
+        now = time.time()
+        # El backend elimina al leerla una entrada más vieja que su edad máxima
+        entry = self._read_l1(key, now) if key in self.l1_keys else self._read(key, now)
+        refresh = False
+
         with self.lock:
             # Verificar si existe y no ha expirado
-            if (key in self.cache and 
-                key in self.timestamps and 
-                current_time - self.timestamps[key] < ttl):
-                return self.cache[key]
-            
-            # Si no existe o expiró, calcular valor
-            if fetch_function:
-                try:
-                    value = fetch_function()
-                    self.cache[key] = value
-                    self.timestamps[key] = current_time
-                    return value
-                except Exception as e:
-                    print(f"Error actualizando caché para '{key}': {e}")
-                    # Si hay error y tenemos un valor anterior, devolverlo
-                    if key in self.cache:
-                        return self.cache[key]
-                    raise e
-            
-            # Si no hay función de fetch, devolver None
-            return self.cache.get(key)
-    
-    def set(self, key: str, value: Any, ttl: Optional[int] = None):
-        """Establece un valor en el caché"""
+            if entry is not None and entry.is_fresh(ttl, now):
+                self.hits[namespace] = self.hits.get(namespace, 0) + 1
+                self._metrics(key).hits += 1
+                return entry.value
+
+            # Vencido el TTL suave pero no el duro: servir el valor viejo y recargarlo aparte
+            stale = (entry is not None and fetch_function and hard_ttl and hard_ttl > ttl
+                     and entry.is_fresh(hard_ttl, now))
+            if stale:
+                self.hits[namespace] = self.hits.get(namespace, 0) + 1
+                self.stale_hits += 1
+                metrics = self._metrics(key)
+                metrics.hits += 1
+                metrics.stale_hits += 1
+                if key not in self.refreshing:
+                    self.refreshing.add(key)
+                    refresh = True
+            else:
+                self.misses[namespace] = self.misses.get(namespace, 0) + 1
+                self._metrics(key).misses += 1
+
+                # Si no hay función de fetch, devolver None
+                if not fetch_function:
+                    return entry.value if entry is not None else None
+
+        if stale:
+            if refresh:
+                self._refresh_in_background(key, fetch_function, ttl, hard_ttl, tags)
+            return entry.value
+
+        # Solo un hilo ejecuta la carga de cada clave; los fallos concurrentes de la
+        # misma clave esperan su resultado y las demás claves siguen sin bloquearse
+        try:
+            return self.loads.do(key, lambda: self._load(key, fetch_function, ttl, hard_ttl, tags))
+        except Exception as e:
+            print(f"Error actualizando caché para '{key}': {e}")
+            # Si hay error y tenemos un valor anterior, devolverlo
+            if entry is not None:
+                return entry.value
+            raise e
+
+    def _read(self, key: str, now: float) -> Optional[CacheEntry]:
+        """Entrada del backend; un backend caído o ilegible cuenta como fallo"""
+        try:
+            return self.backend.get(key, now)
+        except Exception as e:
+            print(f"Error leyendo caché para '{key}': {e}")
+            return None
+
+    @staticmethod
+    def _l1_version_name(key: str) -> str:
+        return f"l1:key:{key}"
+
+    def _read_l1(self, key: str, now: float) -> Optional[CacheEntry]:
+        """
+        Entrada desde el L1 si su sello de versión sigue vigente; si no, desde el backend.
+        El sello se lee antes que la entrada: una escritura posterior lo cambia y la
+        copia se descarta en la siguiente lectura.
+        """
+        try:
+            stamp = tuple(self.backend.get_generations([self._l1_version_name(key), _L1_VERSION_ALL]))
+        except Exception as e:
+            print(f"Error leyendo versión de caché para '{key}': {e}")
+            return self._read(key, now)
+
+        with self.lock:
+            cached = self.l1.get(key)
+            if cached is not None and cached[0] == stamp and not cached[1].is_expired(now):
+                self.l1.move_to_end(key)
+                self.l1_hits += 1
+                return cached[1]
+            self.l1_misses += 1
+
+        entry = self._read(key, now)
+        with self.lock:
+            if entry is None:
+                self.l1.pop(key, None)
+            else:
+                self.l1[key] = (stamp, entry)
+                self.l1.move_to_end(key)
+                if len(self.l1) > L1_MAX_ENTRIES:
+                    self.l1.popitem(last=False)
+        return entry
+
+    def _bump_l1_version(self, key: str):
+        """Cambia el sello de una clave del L1 (todos los workers descartan su copia)"""
+        with self.lock:
+            self.l1.pop(key, None)
+        if key in self.l1_keys:
+            self.backend.bump_generation(self._l1_version_name(key))
+
+    def _write(self, key: str, entry: CacheEntry, tags=()):
+        """
+        Guarda una entrada en el backend. Si no se puede serializar o el backend falla,
+        el valor se sigue devolviendo, solo que no queda cacheado.
+        """
+        try:
+            self.backend.set(key, entry, tags)
+            self._bump_l1_version(key)
+        except Exception as e:
+            print(f"Error guardando caché para '{key}': {e}")
+            with self.lock:
+                self.store_failures += 1
+
+    def _load(self, key: str, fetch_function: Callable, ttl: int, hard_ttl: Optional[int] = None,
+              tags=()) -> Any:
+        """Ejecuta fetch_function y guarda el resultado (se llama dentro de self.loads)"""
+        # Otro hilo (u otro worker) pudo terminar de cargar la clave entre la lectura y este punto
+        entry = self._read(key, time.time())
+        if entry is not None and entry.is_fresh(ttl, time.time()):
+            return entry.value
+
+        load_time = time.time()
+        try:
+            value = fetch_function()
+        except Exception:
+            with self.lock:
+                metrics = self._metrics(key)
+                metrics.load_failures += 1
+                metrics.load_time_total += time.time() - load_time
+            raise
+        duration = time.time() - load_time
+        self._write(key, CacheEntry(value, load_time, ttl, max(ttl, hard_ttl or 0)), tags)
+        with self.lock:
+            metrics = self._metrics(key)
+            metrics.loads += 1
+            metrics.load_time_total += duration
+            metrics.last_load_time = duration
+            metrics.last_loaded_at = load_time
+        return value
+
+    def _metrics(self, key: str) -> _KeyMetrics:
+        """Métricas de una clave (llamar con self.lock tomado)"""
+        metrics = self.key_metrics.get(key)
+        if metrics is None:
+            metrics = self.key_metrics[key] = _KeyMetrics()
+            if len(self.key_metrics) > self.max_entries:
+                self.key_metrics.popitem(last=False)
+        else:
+            self.key_metrics.move_to_end(key)
+        return metrics
+
+    def sweep_expired(self) -> int:
+        """
+        Elimina las entradas vencidas que nadie volvió a leer (ej. claves de generaciones viejas)
+
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        return self.backend.sweep_expired(time.time())
+
+    def start_sweeper(self):
+        """Inicia el barrido periódico de entradas vencidas en un hilo daemon"""
+        with self.lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._sweeper_stop.clear()
+            self._sweeper = threading.Thread(target=self._sweep_loop, name='cache-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def stop_sweeper(self):
+        """Detiene el barrido periódico"""
+        self._sweeper_stop.set()
+
+    def _sweep_loop(self):
+        while not self._sweeper_stop.wait(self.sweep_interval):
+            try:
+                self.sweep_expired()
+            except Exception as e:
+                print(f"Error barriendo entradas vencidas del caché: {e}")
+
+    def _refresh_in_background(self, key: str, fetch_function: Callable, ttl: int,
+                               hard_ttl: Optional[int] = None, tags=()):
+        """Recarga una clave vieja en un hilo aparte (con el contexto de la aplicación actual)"""
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def refresh():
+            try:
+                if app is not None:
+                    with app.app_context():
+                        self.loads.do(key, lambda: self._load(key, fetch_function, ttl, hard_ttl, tags))
+                else:
+                    self.loads.do(key, lambda: self._load(key, fetch_function, ttl, hard_ttl, tags))
+                with self.lock:
+                    self.background_refreshes += 1
+            except Exception as e:
+                # Se sigue sirviendo el valor viejo hasta el TTL duro
+                print(f"Error recargando caché en segundo plano para '{key}': {e}")
+                with self.lock:
+                    self.background_failures += 1
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f"cache-refresh-{key}", daemon=True).start()
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        """Entrada guardada (valor, momento de carga y TTL) sin contar acierto ni fallo"""
+        return self._read(key, time.time())
+
+    def seed_stale(self, key: str, value: Any, ttl: int, hard_ttl: int, tags=()) -> bool:
+        """
+        Guarda un valor ya vencido (ej. de un snapshot) si la clave no existe: la primera
+        lectura lo sirve al instante y lo recarga en segundo plano.
+        Disponible durante hard_ttl - ttl segundos.
+
+        Returns:
+            bool: True si se guardó
+        """
+        now = time.time()
+        if hard_ttl <= ttl or self._read(key, now) is not None:
+            return False
+        self._write(key, CacheEntry(value, now - ttl, ttl, hard_ttl), tags)
+        return True
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, tags=()):
+        """Establece un valor en el caché (con etiquetas opcionales, ver invalidate_tag)"""
         if ttl is None:
             ttl = self.default_ttl
-            
-        with self.lock:
-            self.cache[key] = value
-            self.timestamps[key] = time.time()
-    
+
+        self._write(key, CacheEntry(value, time.time(), ttl), tags)
+
+    @staticmethod
+    def _namespace(key: str) -> str:
+        return key.split(':', 1)[0]
+
+    @staticmethod
+    def _public_key(key: str) -> str:
+        """
+        Clave para publicar en las métricas: las claves con parámetros (ej. búsquedas, que
+        incluyen documentos de clientes e IMEI) se reducen al namespace y un hash corto
+        """
+        if ':' not in key:
+            return key
+        namespace, rest = key.split(':', 1)
+        return f"{namespace}:{hashlib.sha256(rest.encode('utf-8')).hexdigest()[:12]}"
+
+    def get_generation(self, name: str) -> int:
+        """
+        Retorna el contador de generación de un grupo de entradas.
+        Incluirlo en la clave hace inalcanzables las entradas anteriores a la última escritura.
+        Con un backend compartido el contador es el mismo en todos los workers.
+        """
+        try:
+            return self.backend.get_generation(name)
+        except Exception as e:
+            print(f"Error leyendo generación de caché '{name}': {e}")
+            return 0
+
+    def bump_generation(self, name: str) -> int:
+        """Incrementa el contador de generación (invalida las claves que lo incluyen)"""
+        return self.backend.bump_generation(name)
+
     def invalidate(self, key: str):
         """Invalida una entrada específica del caché"""
-        with self.lock:
-            self.cache.pop(key, None)
-            self.timestamps.pop(key, None)
-    
+        self.backend.delete(key)
+        self._bump_l1_version(key)
+
+    def invalidate_tag(self, *tags: str) -> int:
+        """
+        Invalida las entradas guardadas con alguna de las etiquetas.
+        Usa el índice inverso del backend: el costo depende solo de esas entradas.
+
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        removed = self.backend.delete_tag(tags)
+        for key in set(removed) & self.l1_keys:
+            self._bump_l1_version(key)
+        return len(removed)
+
     def invalidate_pattern(self, pattern: str):
-        """Invalida todas las entradas que contengan el patrón"""
-        with self.lock:
-            keys_to_remove = [k for k in self.cache.keys() if pattern in k]
-            for key in keys_to_remove:
-                self.cache.pop(key, None)
-                self.timestamps.pop(key, None)
-    
+        """
+        Invalida todas las entradas que contengan el patrón.
+        Recorre todas las claves: para las escrituras usar invalidate_tag.
+        """
+        self.backend.delete_pattern(pattern)
+        self._clear_l1()
+
     def clear(self):
         """Limpia todo el caché"""
+        self.backend.clear()
+        self._clear_l1()
+
+    def _clear_l1(self):
+        """Descarta el L1 de todos los workers"""
         with self.lock:
-            self.cache.clear()
-            self.timestamps.clear()
-    
-    def get_stats(self) -> Dict[str, Any]:
-        """Retorna estadísticas del caché"""
+            self.l1.clear()
+        if self.l1_keys:
+            self.backend.bump_generation(_L1_VERSION_ALL)
+
+    def get_stats(self, max_keys: int = DEFAULT_STATS_KEYS) -> Dict[str, Any]:
+        """
+        Retorna estadísticas del caché
+
+        'expired_entries' cuenta las entradas que superaron el TTL con que se guardaron
+        (las que siguen en el backend solo se sirven mientras se recargan, ver hard_ttl) y
+        'keys' trae las métricas de las max_keys claves usadas más recientemente en este
+        proceso: aciertos, fallos, cargas, fallos de carga y tiempos de carga, para ajustar
+        los TTL con datos. Las claves no se publican completas (ver _public_key) y
+        'cache_keys' solo cuenta las entradas del backend por namespace.
+        """
+        storage = self.backend.get_stats(time.time())
         with self.lock:
-            current_time = time.time()
-            expired_count = sum(
-                1 for timestamp in self.timestamps.values() 
-                if current_time - timestamp >= self.default_ttl
-            )
-            
+            total_hits = sum(self.hits.values())
+            total_misses = sum(self.misses.values())
+            namespaces = {}
+            for namespace in set(self.hits) | set(self.misses):
+                hits = self.hits.get(namespace, 0)
+                misses = self.misses.get(namespace, 0)
+                namespaces[namespace] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_rate': round(hits / max(hits + misses, 1), 4)
+                }
+
+            cache_keys = {}
+            for key in storage['keys']:
+                namespace = self._namespace(key)
+                cache_keys[namespace] = cache_keys.get(namespace, 0) + 1
+
+            # key_metrics está en orden de uso: las últimas son las más recientes
+            recent_keys = list(self.key_metrics)[-max_keys:] if max_keys > 0 else []
+
+            loads = self.loads.get_stats()
             return {
-                'total_entries': len(self.cache),
-                'expired_entries': expired_count,
-                'active_entries': len(self.cache) - expired_count,
-                'cache_keys': list(self.cache.keys())
+                'backend': self.backend.name,
+                'shared': self.backend.shared,
+                'total_entries': storage['entries'],
+                'expired_entries': storage['expired_entries'],
+                'active_entries': storage['entries'] - storage['expired_entries'],
+                'cache_keys': cache_keys,
+                'tags': storage['tags'],
+                'hits': total_hits,
+                'misses': total_misses,
+                'hit_rate': round(total_hits / max(total_hits + total_misses, 1), 4),
+                'namespaces': namespaces,
+                'loads': loads['executions'],
+                'coalesced_loads': loads['coalesced'],
+                'loads_in_flight': loads['in_flight'],
+                'stale_hits': self.stale_hits,
+                'background_refreshes': self.background_refreshes,
+                'background_failures': self.background_failures,
+                'store_failures': self.store_failures,
+                'l1_entries': len(self.l1),
+                'l1_hits': self.l1_hits,
+                'l1_misses': self.l1_misses,
+                'refreshing': sorted(self.refreshing),
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'approx_bytes': storage['approx_bytes'],
+                'evictions': storage['evictions'],
+                'expirations': storage['expirations'],
+                'tracked_keys': len(self.key_metrics),
+                'keys': {
+                    self._public_key(key): self.key_metrics[key].to_dict()
+                    for key in recent_keys
+                }
             }
 
 # Instancia global del caché
@@ -106,10 +521,28 @@ def get_cache_manager() -> CacheManager:
     """Obtiene la instancia global del gestor de caché"""
     global _cache_manager
     if _cache_manager is None:
-        _cache_manager = CacheManager()
+        config = current_app.config if has_app_context() else {}
+        max_entries = config.get('CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+        max_bytes = config.get('CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+        backend = create_cache_backend(
+            config.get('CACHE_BACKEND', DEFAULT_CACHE_BACKEND),
+            url=config.get('CACHE_URL'),
+            serializer=config.get('CACHE_SERIALIZER', DEFAULT_SERIALIZER),
+            max_entries=max_entries,
+            max_bytes=max_bytes
+        )
+        _cache_manager = CacheManager(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            sweep_interval=config.get('CACHE_SWEEP_INTERVAL', DEFAULT_SWEEP_INTERVAL),
+            backend=backend,
+            l1_keys=L1_KEYS
+        )
+        _cache_manager.start_sweeper()
     return _cache_manager
 
-def cached_query(cache_key: str, query_function: Callable, ttl: int = 300):
+def cached_query(cache_key: str, query_function: Callable, ttl: int = 300,
+                 hard_ttl: Optional[int] = None, tags=()):
     """
     Decorator para cachear resultados de consultas
     
@@ -117,16 +550,18 @@ def cached_query(cache_key: str, query_function: Callable, ttl: int = 300):
         cache_key: Clave única para el caché
         query_function: Función que ejecuta la consulta
         ttl: Tiempo de vida en segundos
+        hard_ttl: Hasta cuándo se sirve el valor viejo mientras se recarga en segundo plano
+        tags: Etiquetas de la entrada (ver CacheManager.invalidate_tag)
     
     Returns:
         Resultado cacheado o recién calculado
     """
     cache = get_cache_manager()
-    return cache.get(cache_key, query_function, ttl)
+    return cache.get(cache_key, query_function, ttl, hard_ttl=hard_ttl, tags=tags)
 
 # Funciones de conveniencia para datos específicos del sistema
 def get_cached_technicians():
-    """Obtiene técnicos del caché (TTL: 10 minutos)"""
+    """Obtiene técnicos del caché (TTL: 10 minutos; viejo hasta 1 hora mientras se recarga; en L1_KEYS)"""
     def fetch_technicians():
         try:
             from .queries import get_technicians
@@ -134,17 +569,19 @@ def get_cached_technicians():
         except Exception as e:
             print(f"Error fetching technicians in cache: {e}")
             return []
-    return cached_query('technicians', fetch_technicians, ttl=600)
+    ttl, hard_ttl = CATALOG_TTLS['technicians']
+    return cached_query('technicians', fetch_technicians, ttl=ttl, hard_ttl=hard_ttl, tags=(CATALOG_TAG,))
 
 def get_cached_product_information():
-    """Obtiene información de productos del caché (TTL: 30 minutos)"""
+    """Obtiene información de productos del caché (TTL: 30 minutos; viejo hasta 6 horas mientras se recarga)"""
     def fetch_product_info():
         from .queries import get_product_information
         return get_product_information()
-    return cached_query('product_information', fetch_product_info, ttl=1800)
+    ttl, hard_ttl = CATALOG_TTLS['product_information']
+    return cached_query('product_information', fetch_product_info, ttl=ttl, hard_ttl=hard_ttl, tags=(CATALOG_TAG,))
 
 def get_cached_spare_parts():
-    """Obtiene repuestos del caché (TTL: 30 minutos)"""
+    """Obtiene repuestos del caché (TTL: 30 minutos; viejo hasta 6 horas mientras se recarga)"""
     def fetch_spare_parts():
         try:
             from .queries import get_spare_parts
@@ -152,43 +589,49 @@ def get_cached_spare_parts():
         except Exception as e:
             print(f"Error fetching spare parts in cache: {e}")
             return []
-    return cached_query('spare_parts', fetch_spare_parts, ttl=1800)
+    ttl, hard_ttl = CATALOG_TTLS['spare_parts']
+    return cached_query('spare_parts', fetch_spare_parts, ttl=ttl, hard_ttl=hard_ttl, tags=(CATALOG_TAG,))
 
 def get_cached_problems():
-    """Obtiene problemas del caché (TTL: 1 hora)"""
+    """
+    Obtiene problemas del caché (TTL: 1 hora; viejo hasta 12 horas mientras se recarga; en L1_KEYS)
+    Retorna dicts {'id', 'name'}, no instancias del ORM: el valor se serializa para los demás
+    workers y una instancia desligada de su sesión no sirve allí (las plantillas leen
+    problem.id y problem.name igual).
+    """
     def fetch_problems():
         try:
+            from models import db
             from models.problems import Problems
-            return Problems.query.order_by(Problems.name).all()
+            return [
+                {'id': problem_id, 'name': name}
+                for problem_id, name in db.session.query(Problems.id, Problems.name).order_by(Problems.name)
+            ]
         except Exception as e:
             print(f"Error fetching problems in cache: {e}")
             return []  # Retornar lista vacía en caso de error
     
-    return cached_query('problems', fetch_problems, ttl=3600)
+    return cached_query('problems', fetch_problems, ttl=3600, hard_ttl=43200, tags=(CATALOG_TAG,))
 
 def get_cached_spare_name():
-    """Obtiene nombres de repuestos del caché (TTL: 30 minutos)"""
+    """Obtiene nombres de repuestos del caché (TTL: 30 minutos; viejo hasta 6 horas mientras se recarga)"""
     def fetch_spare_name():
         from .queries import get_spare_name
         return get_spare_name()
-    return cached_query('spare_name', fetch_spare_name, ttl=1800)
+    ttl, hard_ttl = CATALOG_TTLS['spare_name']
+    return cached_query('spare_name', fetch_spare_name, ttl=ttl, hard_ttl=hard_ttl, tags=(CATALOG_TAG,))
 
 def get_cached_sertec():
-    """Obtiene datos de sertec del caché (TTL: 1 hora)"""
+    """Obtiene datos de sertec del caché (TTL: 1 hora; viejo hasta 12 horas mientras se recarga)"""
     def fetch_sertec():
         from .queries import get_sertec
         return get_sertec()
-    return cached_query('sertec', fetch_sertec, ttl=3600)
+    ttl, hard_ttl = CATALOG_TTLS['sertec']
+    return cached_query('sertec', fetch_sertec, ttl=ttl, hard_ttl=hard_ttl, tags=(CATALOG_TAG,))
 
 def invalidate_static_data():
     """Invalida todos los datos estáticos cuando sea necesario"""
-    cache = get_cache_manager()
-    cache.invalidate('technicians')
-    cache.invalidate('product_information')
-    cache.invalidate('spare_parts')
-    cache.invalidate('spare_name')
-    cache.invalidate('sertec')
-    cache.invalidate('problems')
+    get_cache_manager().invalidate_tag(CATALOG_TAG)
 
 def force_refresh_cache():
     """Fuerza la actualización de todo el caché"""
@@ -0,0 +1,259 @@
+"""
+Snapshot en disco de los catálogos del ERP
+Después de un deploy o reinicio cada worker arranca con el caché vacío y las primeras
+peticiones consultan al ERP técnicos, productos, repuestos y sertec a la vez. Los
+catálogos cacheados (CATALOG_TTLS) se guardan periódicamente en un archivo binario
+(JSON comprimido con zlib) junto con su momento de carga; al arrancar, el worker lo
+lee en milisegundos y los carga como valores vencidos: la primera lectura responde al
+instante y los recarga en segundo plano (ver CacheManager.seed_stale).
+
+El archivo se escribe con permisos 0600 y lleva una firma HMAC-SHA256 con SECRET_KEY:
+uno modificado por otro usuario (o escrito con otra clave) se ignora al arrancar.
+
+Config: CACHE_SNAPSHOT_PATH (vacío = desactivado, el valor por defecto; usar un directorio
+de la aplicación), CACHE_SNAPSHOT_INTERVAL (segundos entre escrituras) y
+CACHE_SNAPSHOT_MAX_AGE (un snapshot más viejo se ignora).
+"""
+import atexit
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+from flask import current_app, has_app_context
+
+from services.cache_manager import get_cache_manager, CATALOG_TTLS, CATALOG_TAG
+
+# Cabecera del archivo: identifica el formato y su versión (seguida de la firma en hex)
+SNAPSHOT_MAGIC = b'TKCATALOG2\n'
+SIGNATURE_LENGTH = hashlib.sha256().digest_size * 2
+
+# Desactivado salvo que Config.CACHE_SNAPSHOT_PATH indique un archivo
+DEFAULT_SNAPSHOT_PATH = ''
+DEFAULT_SNAPSHOT_INTERVAL = 300
+DEFAULT_SNAPSHOT_MAX_AGE = 7 * 24 * 3600
+
+# Momento de carga de cada catálogo en el último snapshot escrito por este proceso
+_saved_versions: Dict[str, float] = {}
+_snapshot_lock = threading.Lock()
+_snapshot_writer = None
+_snapshot_stats = {
+    'path': None,
+    'loaded_catalogs': 0,
+    'loaded_saved_at': None,
+    'load_time': None,
+    'saves': 0,
+    'last_saved_at': None,
+}
+
+
+def _snapshot_config(name, default):
+    return current_app.config.get(name, default) if has_app_context() else default
+
+
+def get_snapshot_path() -> Optional[str]:
+    """Ruta del archivo (Config.CACHE_SNAPSHOT_PATH), o None si el snapshot está desactivado"""
+    path = _snapshot_config('CACHE_SNAPSHOT_PATH', DEFAULT_SNAPSHOT_PATH)
+    return path or None
+
+
+def get_snapshot_secret() -> Optional[bytes]:
+    """Clave de la firma del snapshot (Config.SECRET_KEY)"""
+    secret = _snapshot_config('SECRET_KEY', None)
+    if not secret:
+        return None
+    return secret if isinstance(secret, bytes) else str(secret).encode('utf-8')
+
+
+def _signature(secret, payload) -> bytes:
+    return hmac.new(secret, payload, hashlib.sha256).hexdigest().encode('ascii')
+
+
+def save_catalog_snapshot(path=None, force=False, secret=None) -> int:
+    """
+    Escribe los catálogos cacheados en el archivo (escritura atómica: temporal + rename)
+
+    Args:
+        path: Ruta del archivo (None = get_snapshot_path())
+        force: Escribir aunque ningún catálogo haya cambiado desde el último snapshot
+        secret: Clave de la firma (None = get_snapshot_secret())
+
+    Returns:
+        int: Número de catálogos escritos (0 si no hubo cambios)
+    """
+    path = path or get_snapshot_path()
+    secret = secret or get_snapshot_secret()
+    if not path or not secret:
+        return 0
+
+    cache = get_cache_manager()
+    entries = {}
+    for key in CATALOG_TTLS:
+        entry = cache.peek(key)
+        # Una lista vacía suele ser un error del ERP: no vale la pena conservarla
+        if entry is not None and entry.value:
+            entries[key] = {'loaded_at': entry.timestamp, 'value': entry.value}
+
+    versions = {key: data['loaded_at'] for key, data in entries.items()}
+    with _snapshot_lock:
+        if not entries or (not force and versions == _saved_versions):
+            return 0
+
+        payload = zlib.compress(
+            json.dumps({'saved_at': time.time(), 'entries': entries}, separators=(',', ':')).encode('utf-8'),
+            1
+        )
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            # Solo el usuario del servidor puede leerlo o reemplazarlo
+            descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(descriptor, 'wb') as snapshot_file:
+                snapshot_file.write(SNAPSHOT_MAGIC)
+                snapshot_file.write(_signature(secret, payload))
+                snapshot_file.write(payload)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        _saved_versions.clear()
+        _saved_versions.update(versions)
+        _snapshot_stats['saves'] += 1
+        _snapshot_stats['last_saved_at'] = time.time()
+    return len(entries)
+
+
+def read_catalog_snapshot(path, secret=None) -> Optional[dict]:
+    """
+    Lee el archivo del snapshot y verifica su firma antes de descomprimirlo
+
+    Returns:
+        dict con 'saved_at' y 'entries' ({clave: {'loaded_at', 'value'}}), o None si no
+        existe, no tiene el formato esperado o la firma no coincide
+    """
+    secret = secret or get_snapshot_secret()
+    if not path or not secret or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as snapshot_file:
+        data = snapshot_file.read()
+    if not data.startswith(SNAPSHOT_MAGIC):
+        print(f"Snapshot de catálogos con formato desconocido: {path}")
+        return None
+    signature = data[len(SNAPSHOT_MAGIC):len(SNAPSHOT_MAGIC) + SIGNATURE_LENGTH]
+    payload = data[len(SNAPSHOT_MAGIC) + SIGNATURE_LENGTH:]
+    if not hmac.compare_digest(signature, _signature(secret, payload)):
+        print(f"Snapshot de catálogos con firma inválida: {path}")
+        return None
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+
+def load_catalog_snapshot(path=None, max_age=None, secret=None) -> int:
+    """
+    Carga los catálogos del snapshot como valores vencidos (solo las claves que el caché
+    todavía no tiene, ej. porque otro worker ya las cargó en un backend compartido)
+
+    Args:
+        path: Ruta del archivo (None = get_snapshot_path())
+        max_age: Edad máxima del snapshot en segundos (None = Config.CACHE_SNAPSHOT_MAX_AGE)
+        secret: Clave de la firma (None = get_snapshot_secret())
+
+    Returns:
+        int: Número de catálogos cargados
+    """
+    path = path or get_snapshot_path()
+    if max_age is None:
+        max_age = _snapshot_config('CACHE_SNAPSHOT_MAX_AGE', DEFAULT_SNAPSHOT_MAX_AGE)
+
+    start_time = time.time()
+    try:
+        snapshot = read_catalog_snapshot(path, secret)
+    except Exception as e:
+        print(f"Error leyendo snapshot de catálogos: {e}")
+        return 0
+    if snapshot is None:
+        return 0
+    if time.time() - snapshot['saved_at'] > max_age:
+        print(f"Snapshot de catálogos ignorado por antiguo: {path}")
+        return 0
+
+    cache = get_cache_manager()
+    loaded = 0
+    for key, data in snapshot['entries'].items():
+        if key not in CATALOG_TTLS:
+            continue
+        ttl, hard_ttl = CATALOG_TTLS[key]
+        if cache.seed_stale(key, data['value'], ttl, hard_ttl, tags=(CATALOG_TAG,)):
+            loaded += 1
+
+    with _snapshot_lock:
+        # Lo que ya está en disco no necesita escribirse otra vez
+        _saved_versions.update({key: data['loaded_at'] for key, data in snapshot['entries'].items()})
+        _snapshot_stats.update(
+            path=path,
+            loaded_catalogs=loaded,
+            loaded_saved_at=snapshot['saved_at'],
+            load_time=round(time.time() - start_time, 4),
+        )
+    return loaded
+
+
+def _snapshot_loop(path, interval, secret):
+    while True:
+        time.sleep(interval)
+        try:
+            save_catalog_snapshot(path, secret=secret)
+        except Exception as e:
+            print(f"Error escribiendo snapshot de catálogos: {e}")
+
+
+def _save_at_exit(path, secret):
+    try:
+        save_catalog_snapshot(path, secret=secret)
+    except Exception as e:
+        print(f"Error escribiendo snapshot de catálogos al salir: {e}")
+
+
+def init_catalog_snapshot() -> bool:
+    """
+    Carga el snapshot al arrancar y lo reescribe cada CACHE_SNAPSHOT_INTERVAL segundos
+    (y al terminar el proceso) si algún catálogo se recargó.
+    Debe llamarse dentro de un contexto de aplicación.
+
+    Returns:
+        bool: True si el snapshot está activo
+    """
+    global _snapshot_writer
+
+    path = get_snapshot_path()
+    if not path:
+        return False
+    # El hilo de escritura y atexit corren sin contexto de aplicación: la clave se toma aquí
+    secret = get_snapshot_secret()
+    if not secret:
+        print("Snapshot de catálogos desactivado: falta SECRET_KEY para firmarlo")
+        return False
+
+    loaded = load_catalog_snapshot(path, secret=secret)
+    if loaded:
+        print(f"Snapshot de catálogos cargado ({loaded} catálogos) en {_snapshot_stats['load_time']:.3f}s")
+
+    with _snapshot_lock:
+        _snapshot_stats['path'] = path
+        if _snapshot_writer is None:
+            interval = _snapshot_config('CACHE_SNAPSHOT_INTERVAL', DEFAULT_SNAPSHOT_INTERVAL)
+            _snapshot_writer = threading.Thread(
+                target=_snapshot_loop, args=(path, interval, secret), name='catalog-snapshot', daemon=True
+            )
+            _snapshot_writer.start()
+            atexit.register(_save_at_exit, path, secret)
+    return True
+
+
+def get_snapshot_stats() -> dict:
+    """Estado del snapshot: archivo, catálogos cargados al arrancar y escrituras"""
+    with _snapshot_lock:
+        return dict(_snapshot_stats, catalogs=sorted(_saved_versions))
@@ -0,0 +1,155 @@
+"""
+Conteo total de los listados paginados
+Cachea el COUNT(*) por (tipo de ticket, filtros) hasta la siguiente escritura de un
+ticket de ese tipo y, opcionalmente, estima el total de los listados sin filtros
+con las estadísticas del planificador en vez de contar.
+
+Modos (Config.LISTING_COUNT_MODE):
+- exact:     COUNT(*) cacheado (por defecto)
+- estimated: estimación del planificador para listados sin filtros (PostgreSQL);
+             con filtros o en otros motores se usa el conteo exacto cacheado
+- window:    PaginationService lee la página y el total en una sola sentencia con
+             COUNT(*) OVER (); con cursor o sin funciones de ventana, como exact
+"""
+import json
+
+from flask import current_app, has_app_context
+from sqlalchemy import func
+
+from models import db
+from models.tickets import Tickets
+from services.cache_manager import get_cache_manager
+from services.ticket_events import on_ticket_change
+
+# TTL de los conteos cacheados (segundos); las escrituras los invalidan antes
+COUNT_CACHE_TTL = 300
+
+COUNT_MODES = ('exact', 'estimated', 'window')
+DEFAULT_COUNT_MODE = 'exact'
+
+
+def _listing_generation_name(ticket_type):
+    """Contador de generación de los listados de un tipo de ticket"""
+    return f"listing:{ticket_type}"
+
+
+def listing_count_tags(ticket_type):
+    """Etiqueta de los conteos cacheados de un tipo (la misma del contador de generación)"""
+    return (_listing_generation_name(ticket_type),)
+
+
+def _invalidate_listing_counts(action, snapshot):
+    """
+    Avanza la generación de los listados del tipo nuevo y del anterior del ticket y
+    elimina sus conteos cacheados por etiqueta (no esperan a vencer)
+    """
+    cache = get_cache_manager()
+    ticket_types = {snapshot.get('type_of_service')}
+    ticket_types.add(snapshot.get('_previous', {}).get('type_of_service'))
+    names = [_listing_generation_name(t) for t in ticket_types if t is not None]
+    for name in names:
+        cache.bump_generation(name)
+    cache.invalidate_tag(*names)
+
+
+on_ticket_change(_invalidate_listing_counts)
+
+
+def filter_signature(filters):
+    """
+    Firma estable de los filtros activos (los vacíos no cambian el resultado)
+
+    Ej. {'city': ' Medellín', 'state': '', 'search': None} -> '{"city":"Medellín"}'
+    """
+    active = {
+        field: str(value).strip()
+        for field, value in (filters or {}).items()
+        if value and str(value).strip()
+    }
+    return json.dumps(active, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+def listing_count_key(ticket_type, filters=None):
+    """Clave del conteo exacto cacheado de un listado (incluye la generación actual del tipo)"""
+    generation = get_cache_manager().get_generation(_listing_generation_name(ticket_type))
+    return f"count:{ticket_type}:{generation}:{filter_signature(filters)}"
+
+
+def resolve_count_mode(count_mode=None):
+    if count_mode is None and has_app_context():
+        count_mode = current_app.config.get('LISTING_COUNT_MODE', DEFAULT_COUNT_MODE)
+    count_mode = str(count_mode or DEFAULT_COUNT_MODE).lower()
+    return count_mode if count_mode in COUNT_MODES else DEFAULT_COUNT_MODE
+
+
+def _as_statement(query):
+    """Acepta un Query del ORM o un select() de Core"""
+    return query.statement if hasattr(query, 'statement') else query
+
+
+def exact_count(query, params=None):
+    """COUNT(*) del listado sin ORDER BY, con sus parámetros enlazados (sin literal_binds)"""
+    statement = _as_statement(query).order_by(None).with_only_columns(
+        func.count(), maintain_column_froms=True
+    )
+    return db.session.execute(
+        statement, params or {}, bind_arguments={'mapper': Tickets.__mapper__}
+    ).scalar()
+
+
+def estimate_count(query, params=None):
+    """
+    Estimación del número de filas según el planificador (EXPLAIN), sin recorrer la tabla
+
+    Returns:
+        int, o None si el motor no permite estimar
+    """
+    connection = db.session.connection(bind_arguments={'mapper': Tickets.__mapper__})
+    if connection.dialect.name != 'postgresql':
+        return None
+
+    compiled = _as_statement(query).order_by(None).compile(dialect=connection.dialect)
+    plan = connection.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.construct_params(params or {})
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def get_listing_count(query, ticket_type, filters=None, count_mode=None, params=None):
+    """
+    Total de filas de un listado
+
+    Args:
+        query: Query del ORM o select() de Core del listado con los filtros ya aplicados
+        ticket_type: type_of_service del listado (define qué escrituras invalidan el conteo)
+        filters: Filtros aplicados (forman la clave del caché)
+        count_mode: 'exact', 'estimated' o 'window' (None = Config.LISTING_COUNT_MODE)
+        params: Valores de los bindparam del select() (si los tiene)
+
+    Returns:
+        tuple: (total, es_estimado)
+    """
+    cache = get_cache_manager()
+    signature = filter_signature(filters)
+    generation = cache.get_generation(_listing_generation_name(ticket_type))
+
+    if resolve_count_mode(count_mode) == 'estimated' and signature == '{}':
+        try:
+            estimate = cache.get(
+                f"count_estimate:{ticket_type}:{generation}",
+                lambda: estimate_count(query, params),
+                ttl=COUNT_CACHE_TTL,
+                tags=listing_count_tags(ticket_type)
+            )
+            if estimate is not None:
+                return estimate, True
+        except Exception as e:
+            print(f"Error estimando conteo del listado: {e}")
+
+    count_key = listing_count_key(ticket_type, filters)
+    return cache.get(
+        count_key, lambda: exact_count(query, params), ttl=COUNT_CACHE_TTL,
+        tags=listing_count_tags(ticket_type)
+    ), False
@@ -0,0 +1,269 @@
+"""
+Motor genérico de listados de tickets
+Reemplaza los filtros copiados en los servicios Optimized*: cada combinación de filtros
+se compila una sola vez en un select() de SQLAlchemy Core con bindparam y se cachea;
+en cada petición solo se enlazan los valores. El SQL generado es idéntico entre
+peticiones, así la base de datos puede reutilizar el plan preparado.
+"""
+import math
+import threading
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, or_, and_, bindparam, Integer, DateTime
+
+from models import db
+from models.tickets import Tickets, normalize_text
+from services.search_query import escape_like, ticket_id_value
+from services.listing_counts import get_listing_count
+from services.ticket_rows import TicketRow, TICKET_ROW_COLUMNS
+
+# Filtros que entiende el motor (el orden no importa: la forma se ordena)
+LISTING_FILTERS = ('search', 'state', 'state_not', 'city', 'priority', 'date_from', 'date_to')
+
+DEFAULT_PAGE_SIZE = 20
+
+
+def _prefix(value):
+    return f"{escape_like(value)}%"
+
+
+def _date_value(value):
+    """
+    Las fechas de los filtros llegan como texto ISO (YYYY-MM-DD) desde los formularios.
+    Retorna None si el texto no es una fecha válida.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _filter_value(filters, field):
+    """
+    Valor activo de un filtro, o None si está vacío o no es válido.
+    Una fecha mal escrita se ignora (como un filtro vacío) en lugar de llegar a la base de datos.
+    """
+    value = (filters or {}).get(field)
+    if not value or not str(value).strip():
+        return None
+    value = str(value).strip()
+    if field in ('date_from', 'date_to'):
+        return _date_value(value)
+    return value
+
+
+class ListingEngine:
+    """
+    Construye y cachea las sentencias de los listados por forma de filtros.
+
+    La forma es la tupla ordenada de filtros activos (ej. ('city', 'state')); dos
+    peticiones con la misma forma y distintos valores comparten la sentencia.
+    """
+
+    def __init__(self):
+        self.statements = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def filter_shape(filters) -> Tuple[str, ...]:
+        """Filtros activos, ordenados (los vacíos, inválidos o desconocidos no forman parte)"""
+        shape = []
+        for field in LISTING_FILTERS:
+            value = _filter_value(filters, field)
+            if value is None:
+                continue
+            shape.append(field)
+            if field == 'search' and ticket_id_value(value) is not None:
+                # Un término numérico que cabe en la columna también se compara con el id del ticket
+                shape.append('search_id')
+        return tuple(sorted(shape))
+
+    @staticmethod
+    def bind_values(filters) -> Dict[str, object]:
+        """Valores de los bindparam de la forma de estos filtros"""
+        params = {}
+        for field in LISTING_FILTERS:
+            value = _filter_value(filters, field)
+            if value is None:
+                continue
+            if field == 'search':
+                params['search_prefix'] = _prefix(value)
+                params['search_normalized_prefix'] = _prefix(normalize_text(value))
+                ticket_id = ticket_id_value(value)
+                if ticket_id is not None:
+                    params['search_id'] = ticket_id
+            elif field == 'city':
+                params['city_prefix'] = _prefix(normalize_text(value))
+            else:
+                params[field] = value
+        return params
+
+    @staticmethod
+    def _build_conditions(shape) -> List:
+        """Condiciones con bindparam para una forma (sin valores)"""
+        conditions = []
+        for field in shape:
+            if field == 'search':
+                # Prefijos sobre columnas indexadas: la subcadena completa es la de SearchService
+                search_conditions = [
+                    Tickets.IMEI.like(bindparam('search_prefix'), escape='\\'),
+                    Tickets.document_client.like(bindparam('search_prefix'), escape='\\'),
+                    Tickets.product_code.like(bindparam('search_prefix'), escape='\\'),
+                    Tickets.technical_name_normalized.like(bindparam('search_normalized_prefix'), escape='\\'),
+                    Tickets.reference_normalized.like(bindparam('search_normalized_prefix'), escape='\\'),
+                ]
+                if 'search_id' in shape:
+                    search_conditions.append(Tickets.id_ticket == bindparam('search_id', type_=Integer))
+                conditions.append(or_(*search_conditions))
+            elif field == 'state':
+                conditions.append(Tickets.state == bindparam('state'))
+            elif field == 'state_not':
+                conditions.append(Tickets.state != bindparam('state_not'))
+            elif field == 'city':
+                # Usa idx_tickets_type_city_normalized (sin tildes ni mayúsculas)
+                conditions.append(Tickets.city_normalized.like(bindparam('city_prefix'), escape='\\'))
+            elif field == 'priority':
+                conditions.append(Tickets.priority == bindparam('priority'))
+            elif field == 'date_from':
+                conditions.append(Tickets.creation_date >= bindparam('date_from', type_=DateTime))
+            elif field == 'date_to':
+                conditions.append(Tickets.creation_date <= bindparam('date_to', type_=DateTime))
+        return conditions
+
+    def _cached(self, kind, shape, build):
+        key = (kind, shape)
+        with self.lock:
+            statement = self.statements.get(key)
+            if statement is not None:
+                self.hits += 1
+                return statement
+            self.misses += 1
+
+        statement = build()
+        with self.lock:
+            return self.statements.setdefault(key, statement)
+
+    def filter_conditions(self, filters):
+        """
+        Condiciones cacheadas y valores para aplicar los filtros a un Query del ORM
+
+        Returns:
+            tuple: (lista de condiciones con bindparam, dict de valores)
+        """
+        shape = self.filter_shape(filters)
+        conditions = self._cached('conditions', shape, lambda: self._build_conditions(shape))
+        return conditions, self.bind_values(filters)
+
+    def _rows_statement(self, shape):
+        """
+        SELECT de los tickets de un tipo con los filtros de la forma, sin orden.
+        Solo lee las columnas de las tablas (TICKET_ROW_COLUMNS).
+        """
+        return self._cached('rows', shape, lambda: select(*TICKET_ROW_COLUMNS).where(
+            Tickets.type_of_service == bindparam('ticket_type'),
+            *self._build_conditions(shape)
+        ))
+
+    def _page_statement(self, shape, kind):
+        """
+        Página del listado: 'offset', 'next' (después del cursor) o 'prev' (antes del cursor)
+        """
+        def build():
+            statement = self._rows_statement(shape)
+            activity = Tickets.get_activity_expression()
+            cursor_activity = bindparam('cursor_activity', type_=DateTime)
+            cursor_id = bindparam('cursor_id', type_=Integer)
+
+            if kind == 'prev':
+                return statement.where(or_(
+                    activity > cursor_activity,
+                    and_(activity == cursor_activity, Tickets.id_ticket > cursor_id)
+                )).order_by(activity.asc(), Tickets.id_ticket.asc()).limit(bindparam('limit', type_=Integer))
+
+            statement = statement.order_by(activity.desc(), Tickets.id_ticket.desc())
+            if kind == 'next':
+                return statement.where(or_(
+                    activity < cursor_activity,
+                    and_(activity == cursor_activity, Tickets.id_ticket < cursor_id)
+                )).limit(bindparam('limit', type_=Integer))
+            return statement.limit(bindparam('limit', type_=Integer)).offset(bindparam('offset', type_=Integer))
+
+        return self._cached(kind, shape, build)
+
+    def paginate(self, ticket_type, page=1, filters=None, cursor=None, direction='next',
+                 page_size=DEFAULT_PAGE_SIZE):
+        """
+        Página de un listado de tickets
+
+        Args:
+            ticket_type: type_of_service del listado ("0"=ST, "1"=RI, "2"=GA)
+            page: Número de página que se va a mostrar
+            filters: Dict con filtros (ver LISTING_FILTERS)
+            cursor: prev_cursor/next_cursor de la página actual (opcional)
+            direction: 'next' o 'prev' según el cursor
+            page_size: Filas por página
+
+        Returns:
+            Dict con 'items' (TicketRow) y 'pagination'
+
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        from services.pagination_service import decode_keyset_cursor, build_pagination
+
+        shape = self.filter_shape(filters)
+        params = self.bind_values(filters)
+        params['ticket_type'] = str(ticket_type)
+
+        total_count, estimated = get_listing_count(
+            self._rows_statement(shape), ticket_type, filters, params=params
+        )
+        total_pages = math.ceil(total_count / page_size)
+        page = max(1, page if estimated else min(page, total_pages))
+
+        if cursor:
+            activity, last_id, _ = decode_keyset_cursor(cursor)
+            kind = 'prev' if direction == 'prev' else 'next'
+            params.update(cursor_activity=activity, cursor_id=last_id)
+        else:
+            kind = 'offset'
+            params['offset'] = (page - 1) * page_size
+        params['limit'] = page_size
+
+        result = db.session.execute(
+            self._page_statement(shape, kind), params, bind_arguments={'mapper': Tickets.__mapper__}
+        )
+        items = [TicketRow(*row) for row in result]
+        if kind == 'prev':
+            items.reverse()
+
+        return {
+            'items': items,
+            'pagination': build_pagination(page, page_size, total_count, items, estimated)
+        }
+
+    def get_stats(self) -> Dict[str, object]:
+        """Estadísticas del caché de sentencias"""
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'statements': len(self.statements),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+# Instancia global del motor
+_listing_engine = None
+
+
+def get_listing_engine() -> ListingEngine:
+    """Obtiene la instancia global del motor de listados"""
+    global _listing_engine
+    if _listing_engine is None:
+        _listing_engine = ListingEngine()
+    return _listing_engine
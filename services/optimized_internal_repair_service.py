@@ -6,10 +6,9 @@ Ahora usa el modelo de tickets normal con type_of_service = "1"
 Estimación de mejora: 85-95% más rápido que la versión original
 """
 
-import math
-from sqlalchemy import text, func
-from models import db
-from models.tickets import Tickets
+from services.pagination_service import build_pagination
+from services.listing_engine import get_listing_engine
+from services.ticket_stats import get_ticket_stats
 
 
 class OptimizedInternalRepairService:
@@ -21,163 +20,78 @@ class OptimizedInternalRepairService:
     def __init__(self, page_size=20):
         self.page_size = page_size
         
-    def get_paginated_internal_repairs(self, page=1, filters=None):
+    def get_paginated_internal_repairs(self, page=1, filters=None, cursor=None, direction='next'):
         """
         🚀 CONSULTA SUPER OPTIMIZADA que aprovecha todos los índices creados
         
+        Con cursor (prev_cursor/next_cursor de la página actual) la página se lee
+        por keyset (actividad, id_ticket): la página 500 cuesta lo mismo que la 1.
+        
         ÍNDICES APROVECHADOS:
-        - idx_tickets_pagination (type_of_service, creation_date DESC)
+        - idx_tickets_type_last_activity (type_of_service, last_activity DESC, id_ticket DESC)
         - idx_internal_repair_active (específico para reparación interna)
         - idx_tickets_filters (type_of_service, state, city)
         - idx_tickets_document_client (document_client)
         - idx_tickets_imei (IMEI)
         """
         try:
-            # USAR EL MODELO DE TICKETS NORMAL
             
-            # 🎯 QUERY BASE PARA REPARACIÓN INTERNA (type_of_service = "1")
-            base_query = Tickets.query.filter(
-                Tickets.type_of_service == "1"
-            ).order_by(
-                Tickets.get_latest_activity_expression()  # Ordenar por actividad más reciente
+            # 🎯 SENTENCIA COMPILADA UNA VEZ POR COMBINACIÓN DE FILTROS
+            # El motor reutiliza el select() cacheado y solo enlaza los valores;
+            # el conteo se cachea por filtros hasta la siguiente escritura de este tipo
+            return get_listing_engine().paginate(
+                "1", page, filters, cursor, direction, page_size=self.page_size
             )
             
-            # 🔧 APLICAR FILTROS DE MANERA OPTIMIZADA
-            if filters:
-                base_query = self._apply_optimized_filters(base_query, filters)
-            
-            # 📊 CONTAR TOTAL CON CONSULTA OPTIMIZADA
-            total_count = base_query.count()
-            
-            # 🧮 CALCULAR PAGINACIÓN
-            total_pages = math.ceil(total_count / self.page_size)
-            page = max(1, min(page, total_pages))
-            offset = (page - 1) * self.page_size
-            
-            # 🚀 OBTENER DATOS PAGINADOS
-            # LIMIT/OFFSET con índice es ultra-rápido
-            items = base_query.offset(offset).limit(self.page_size).all()
-            
-            return {
-                'items': items,
-                'pagination': {
-                    'page': page,
-                    'pages': total_pages,
-                    'per_page': self.page_size,
-                    'total': total_count,
-                    'has_prev': page > 1,
-                    'has_next': page < total_pages,
-                    'prev_num': page - 1 if page > 1 else None,
-                    'next_num': page + 1 if page < total_pages else None
-                }
-            }
-            
         except Exception as e:
             print(f"🚨 Error en consulta optimizada de reparación interna: {e}")
             # Fallback al servicio original si hay error
-            return self._fallback_query(page, filters)
-    
-    def _apply_optimized_filters(self, query, filters):
-        """
-        🎯 FILTROS OPTIMIZADOS para reparación interna - usando modelo tickets normal
-        """
-        # USAR EL MODELO DE TICKETS NORMAL
-        
-        for field, value in filters.items():
-            if not value or not str(value).strip():
-                continue
-                
-            if field == 'search':
-                # 🔍 BÚSQUEDA OPTIMIZADA en múltiples campos
-                search_term = f"%{str(value).strip()}%"
-                query = query.filter(
-                    (Tickets.IMEI.ilike(search_term)) |
-                    (Tickets.document_client.ilike(search_term)) |
-                    (Tickets.technical_name.ilike(search_term)) |
-                    (Tickets.reference.ilike(search_term)) |
-                    (func.cast(Tickets.id_ticket, db.String).ilike(search_term))
-                )
-                
-            elif field == 'state':
-                # 🎯 FILTRO DE ESTADO
-                query = query.filter(Tickets.state == value)
-                
-            elif field == 'state_not':
-                # ❌ EXCLUIR ESTADO - Para filtro "Activos"
-                query = query.filter(Tickets.state != value)
-                
-            elif field == 'city':
-                # 🏙️ FILTRO DE CIUDAD
-                city_value = str(value).lower()
-                if city_value in ['medellin', 'medellín']:
-                    query = query.filter(Tickets.city.ilike('%medell%'))
-                elif city_value in ['bogota', 'bogotá']:
-                    query = query.filter(Tickets.city.ilike('%bogot%'))
-                else:
-                    query = query.filter(Tickets.city == value)
-                    
-            elif field == 'priority':
-                # ⚡ FILTRO DE PRIORIDAD
-                query = query.filter(Tickets.priority == value)
-                
-            elif field == 'date_from':
-                # 📅 FILTRO FECHA DESDE
-                query = query.filter(Tickets.creation_date >= value)
-                
-            elif field == 'date_to':
-                # 📅 FILTRO FECHA HASTA
-                query = query.filter(Tickets.creation_date <= value)
-        
-        return query
+            return self._fallback_query(page, filters, cursor, direction)
     
-    def _fallback_query(self, page, filters):
+    def _fallback_query(self, page, filters, cursor=None, direction='next'):
         """
         Consulta de respaldo si la optimizada falla
         """
         try:
             from apps.tickets.services.pagination_service import get_paginated_tickets
-            return get_paginated_tickets(ticket_type="1", page=page, filters=filters)
+            return get_paginated_tickets(ticket_type="1", page=page, filters=filters, cursor=cursor, direction=direction)
         except Exception as e:
             print(f"🚨 Fallback de reparación interna también falló: {e}")
             return {
                 'items': [],
-                'pagination': {
-                    'page': 1, 'pages': 0, 'per_page': self.page_size,
-                    'total': 0, 'has_prev': False, 'has_next': False,
-                    'prev_num': None, 'next_num': None
-                }
+                'pagination': build_pagination(1, self.page_size, 0)
             }
     
     def get_performance_stats(self):
         """
         📊 Obtiene estadísticas de rendimiento de reparación interna
+        
+        Conteos por estado, ciudad y día con una consulta agrupada por dimensión
+        (ver services.ticket_stats), cacheados unos segundos
         """
         try:
-            # USAR EL MODELO DE TICKETS NORMAL
-            
-            # Filtrar por reparación interna (type_of_service = "1")
-            stats = {
-                'total_repairs': Tickets.query.filter(Tickets.type_of_service == "1").count(),
-                'by_state': {},
-                'by_city': {},
-                'recent_activity': {}
+            stats = get_ticket_stats("1")
+            return {
+                'total_repairs': stats['total'],
+                'by_state': stats['by_state'],
+                'by_city': stats['by_city'],
+                'recent_activity': stats['recent_activity']
             }
             
-            return stats
-            
         except Exception as e:
             print(f"Error obteniendo estadísticas de reparación interna: {e}")
             return {}
 
-
 # 🚀 FUNCIÓN DE CONVENIENCIA OPTIMIZADA
-def get_optimized_internal_repairs(page=1, filters=None):
+def get_optimized_internal_repairs(page=1, filters=None, cursor=None, direction='next'):
     """
     Función optimizada para obtener reparaciones internas
     
     Args:
         page: Número de página (por defecto 1)
         filters: Filtros a aplicar (dict)
+        cursor: next_cursor/prev_cursor de la página actual (opcional)
+        direction: 'next' o 'prev' según el cursor
         
     Returns:
         Dict con 'items' y 'pagination'
@@ -188,7 +102,7 @@ def get_optimized_internal_repairs(page=1, filters=None):
         pagination = result['pagination']
     """
     service = OptimizedInternalRepairService(page_size=20)
-    return service.get_paginated_internal_repairs(page, filters)
+    return service.get_paginated_internal_repairs(page, filters, cursor, direction)
 
 
 # 📊 FUNCIÓN PARA ESTADÍSTICAS RÁPIDAS
@@ -5,10 +5,9 @@ Aprovecha los índices de base de datos para máximo rendimiento
 Estimación de mejora: 85-95% más rápido que la versión original
 """
 
-import math
-from sqlalchemy import text, func
-from models import db
-from models.tickets import Tickets
+from services.pagination_service import build_pagination
+from services.listing_engine import get_listing_engine
+from services.ticket_stats import get_ticket_stats
 
 
 class OptimizedTechnicalService:
@@ -20,12 +19,15 @@ class OptimizedTechnicalService:
     def __init__(self, page_size=20):
         self.page_size = page_size
         
-    def get_paginated_tickets(self, page=1, filters=None):
+    def get_paginated_tickets(self, page=1, filters=None, cursor=None, direction='next'):
         """
         🚀 CONSULTA SUPER OPTIMIZADA que aprovecha todos los índices creados
         
+        Con cursor (prev_cursor/next_cursor de la página actual) la página se lee
+        por keyset (actividad, id_ticket): la página 500 cuesta lo mismo que la 1.
+        
         ÍNDICES APROVECHADOS:
-        - idx_tickets_pagination (type_of_service, creation_date DESC)
+        - idx_tickets_type_last_activity (type_of_service, last_activity DESC, id_ticket DESC)
         - idx_tickets_filters (type_of_service, state, city)
         - idx_tickets_document_client (document_client)
         - idx_tickets_technical_name (technical_name)
@@ -33,188 +35,62 @@ class OptimizedTechnicalService:
         """
         try:
             
-            # 🎯 QUERY BASE CON ÍNDICE PRINCIPAL
-            # Usa idx_tickets_pagination para máximo rendimiento
-            base_query = Tickets.query.filter(
-                text("type_of_service = '0'")
-            ).order_by(
-                text("creation_date DESC")  # Aprovecha el índice DESC
+            # 🎯 SENTENCIA COMPILADA UNA VEZ POR COMBINACIÓN DE FILTROS
+            # El motor reutiliza el select() cacheado y solo enlaza los valores;
+            # el conteo se cachea por filtros hasta la siguiente escritura de este tipo
+            return get_listing_engine().paginate(
+                "0", page, filters, cursor, direction, page_size=self.page_size
             )
             
-            # 🔧 APLICAR FILTROS DE MANERA OPTIMIZADA
-            if filters:
-                base_query = self._apply_optimized_filters(base_query, filters)
-            
-            # 📊 CONTAR TOTAL CON CONSULTA OPTIMIZADA
-            # Usar COUNT(*) que es más rápido que .count()
-            count_query = base_query.statement.compile(compile_kwargs={"literal_binds": True})
-            total_count = db.session.execute(
-                text(f"SELECT COUNT(*) FROM ({count_query}) AS count_query")
-            ).scalar()
-            
-            # 🧮 CALCULAR PAGINACIÓN
-            total_pages = math.ceil(total_count / self.page_size)
-            page = max(1, min(page, total_pages))
-            offset = (page - 1) * self.page_size
-            
-            # 🚀 OBTENER DATOS PAGINADOS
-            # LIMIT/OFFSET con índice es ultra-rápido
-            items = base_query.offset(offset).limit(self.page_size).all()
-            
-            return {
-                'items': items,
-                'pagination': {
-                    'page': page,
-                    'pages': total_pages,
-                    'per_page': self.page_size,
-                    'total': total_count,
-                    'has_prev': page > 1,
-                    'has_next': page < total_pages,
-                    'prev_num': page - 1 if page > 1 else None,
-                    'next_num': page + 1 if page < total_pages else None
-                }
-            }
-            
         except Exception as e:
             print(f"🚨 Error en consulta optimizada: {e}")
             # Fallback al servicio original si hay error
-            return self._fallback_query(page, filters)
+            return self._fallback_query(page, filters, cursor, direction)
     
-    def _apply_optimized_filters(self, query, filters):
-        """
-        🎯 FILTROS OPTIMIZADOS que aprovechan todos los índices creados
-        """
-        for field, value in filters.items():
-            if not value or not str(value).strip():
-                continue
-                
-            if field == 'search':
-                # 🔍 BÚSQUEDA OPTIMIZADA usando índices específicos
-                search_term = str(value).strip()
-                
-                # Usar UNION para aprovechar múltiples índices por separado
-                # Esto es más rápido que OR cuando hay índices específicos
-                query = query.filter(
-                    text("""(
-                        IMEI LIKE :search OR 
-                        document_client LIKE :search OR 
-                        technical_name LIKE :search OR
-                        CAST(id_ticket AS VARCHAR) LIKE :search
-                    )""")
-                ).params(search=f"%{search_term}%")
-                
-            elif field == 'state':
-                # 🎯 FILTRO DE ESTADO - Usa idx_tickets_state
-                query = query.filter(text("state = :state")).params(state=value)
-                
-            elif field == 'state_not':
-                # ❌ EXCLUIR ESTADO - Para filtro "Activos"
-                query = query.filter(text("state != :state_not")).params(state_not=value)
-                
-            elif field == 'city':
-                # 🏙️ FILTRO DE CIUDAD - Usa idx_tickets_city
-                city_value = str(value).lower()
-                if city_value in ['medellin', 'medellín']:
-                    query = query.filter(text("LOWER(city) LIKE '%medell%'"))
-                elif city_value in ['bogota', 'bogotá']:
-                    query = query.filter(text("LOWER(city) LIKE '%bogot%'"))
-                else:
-                    query = query.filter(text("city = :city")).params(city=value)
-                    
-            elif field == 'priority':
-                # ⚡ FILTRO DE PRIORIDAD
-                query = query.filter(text("priority = :priority")).params(priority=value)
-                
-            elif field == 'date_from':
-                # 📅 FILTRO FECHA DESDE - Usa idx_tickets_creation_date
-                query = query.filter(text("creation_date >= :date_from")).params(date_from=value)
-                
-            elif field == 'date_to':
-                # 📅 FILTRO FECHA HASTA
-                query = query.filter(text("creation_date <= :date_to")).params(date_to=value)
-        
-        return query
-    
-    def _fallback_query(self, page, filters):
+    def _fallback_query(self, page, filters, cursor=None, direction='next'):
         """
         Consulta de respaldo si la optimizada falla
         """
         try:
             from apps.tickets.services.pagination_service import get_paginated_technical_service
-            return get_paginated_technical_service(page, filters)
+            return get_paginated_technical_service(page, filters, cursor, direction)
         except Exception as e:
             print(f"🚨 Fallback también falló: {e}")
             return {
                 'items': [],
-                'pagination': {
-                    'page': 1, 'pages': 0, 'per_page': self.page_size,
-                    'total': 0, 'has_prev': False, 'has_next': False,
-                    'prev_num': None, 'next_num': None
-                }
+                'pagination': build_pagination(1, self.page_size, 0)
             }
     
     def get_performance_stats(self):
         """
         📊 Obtiene estadísticas de rendimiento del servicio técnico
+        
+        Conteos por estado, ciudad y día con una consulta agrupada por dimensión
+        (ver services.ticket_stats), cacheados unos segundos
         """
         try:
-            from apps.tickets.models.tickets import Tickets
-            
-            # Consultas rápidas usando índices
-            stats = {
-                'total_tickets': db.session.execute(
-                    text("SELECT COUNT(*) FROM tickets WHERE type_of_service = '0'")
-                ).scalar(),
-                
-                'by_state': db.session.execute(
-                    text("""
-                        SELECT state, COUNT(*) as count 
-                        FROM tickets 
-                        WHERE type_of_service = '0' 
-                        GROUP BY state 
-                        ORDER BY count DESC
-                    """)
-                ).fetchall(),
-                
-                'by_city': db.session.execute(
-                    text("""
-                        SELECT city, COUNT(*) as count 
-                        FROM tickets 
-                        WHERE type_of_service = '0' 
-                        GROUP BY city 
-                        ORDER BY count DESC
-                        LIMIT 10
-                    """)
-                ).fetchall(),
-                
-                'recent_activity': db.session.execute(
-                    text("""
-                        SELECT DATE(creation_date) as date, COUNT(*) as count
-                        FROM tickets 
-                        WHERE type_of_service = '0' 
-                        AND creation_date >= CURRENT_DATE - INTERVAL '30 days'
-                        GROUP BY DATE(creation_date)
-                        ORDER BY date DESC
-                        LIMIT 30
-                    """)
-                ).fetchall()
+            stats = get_ticket_stats("0")
+            return {
+                'total_tickets': stats['total'],
+                'by_state': stats['by_state'],
+                'by_city': stats['by_city'],
+                'recent_activity': stats['recent_activity']
             }
             
-            return stats
-            
         except Exception as e:
             print(f"Error obteniendo estadísticas: {e}")
             return {}
 
-
 # 🚀 FUNCIÓN DE CONVENIENCIA OPTIMIZADA
-def get_optimized_technical_service(page=1, filters=None):
+def get_optimized_technical_service(page=1, filters=None, cursor=None, direction='next'):
     """
     Función optimizada para obtener tickets de servicio técnico
     
     Args:
         page: Número de página (por defecto 1)
         filters: Filtros a aplicar (dict)
+        cursor: next_cursor/prev_cursor de la página actual (opcional)
+        direction: 'next' o 'prev' según el cursor
         
     Returns:
         Dict con 'items' y 'pagination'
@@ -225,7 +101,7 @@ def get_optimized_technical_service(page=1, filters=None):
         pagination = result['pagination']
     """
     service = OptimizedTechnicalService(page_size=20)
-    return service.get_paginated_tickets(page, filters)
+    return service.get_paginated_tickets(page, filters, cursor, direction)
 
 
 # 📊 FUNCIÓN PARA ESTADÍSTICAS RÁPIDAS
@@ -2,13 +2,148 @@
 Servicio de paginación optimizada para tablas grandes
 Mantiene la misma apariencia visual pero carga datos eficientemente
 """
-from sqlalchemy import func, text
+from sqlalchemy import func, or_, and_
 from flask import request
+from datetime import datetime
+import base64
+import json
 import math
 
+from services.listing_counts import (
+    get_listing_count, listing_count_key, listing_count_tags, resolve_count_mode, COUNT_CACHE_TTL
+)
+
+# Primera versión de SQLite con funciones de ventana (COUNT(*) OVER ())
+SQLITE_WINDOW_FUNCTIONS_VERSION = (3, 25, 0)
+
+
+def supports_window_functions(bind):
+    """
+    Indica si el motor de la conexión soporta COUNT(*) OVER ()
+    
+    Args:
+        bind: Engine o Connection de SQLAlchemy
+    """
+    dialect = bind.dialect
+    if dialect.name == 'sqlite':
+        dbapi = getattr(dialect, 'loaded_dbapi', None) or dialect.dbapi
+        return tuple(dbapi.sqlite_version_info) >= SQLITE_WINDOW_FUNCTIONS_VERSION
+    if dialect.name in ('mysql', 'mariadb'):
+        # MySQL 8.0 y MariaDB 10.2; la versión se conoce después de la primera conexión
+        server_version = tuple(dialect.server_version_info or ())
+        minimum = (10, 2) if getattr(dialect, 'is_mariadb', False) else (8, 0)
+        return server_version >= minimum
+    return dialect.name in ('postgresql', 'mssql', 'oracle')
+
+
+def encode_keyset_cursor(ticket, **extra):
+    """
+    Cursor opaco con la posición (actividad, id_ticket) de un ticket en el orden
+    de los listados (actividad DESC, id DESC)
+    
+    Args:
+        ticket: Ticket que marca la posición
+        **extra: Datos adicionales que viajan en el cursor
+    """
+    payload = dict(extra, a=ticket.get_latest_activity().isoformat(), i=ticket.id_ticket)
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_keyset_cursor(cursor):
+    """
+    Decodifica un cursor de encode_keyset_cursor
+    
+    Returns:
+        tuple: (actividad, id_ticket, dict con los datos adicionales)
+        
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        activity = datetime.fromisoformat(payload.pop('a'))
+        return activity, int(payload.pop('i')), payload
+    except Exception:
+        raise ValueError("Cursor de paginación inválido")
+
+
+def keyset_condition(cursor, direction='next'):
+    """
+    Condición para leer las filas posteriores ('next') o anteriores ('prev') al cursor
+    
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    from models.tickets import Tickets
+    
+    activity, last_id, _ = decode_keyset_cursor(cursor)
+    activity_expression = Tickets.get_activity_expression()
+    if direction == 'prev':
+        return or_(
+            activity_expression > activity,
+            and_(activity_expression == activity, Tickets.id_ticket > last_id)
+        )
+    return or_(
+        activity_expression < activity,
+        and_(activity_expression == activity, Tickets.id_ticket < last_id)
+    )
+
+
+def get_keyset_items(query, page_size, cursor, direction='next'):
+    """
+    Lee una página a partir del cursor sin OFFSET: la página 500 cuesta lo mismo que la 1
+    
+    Args:
+        query: Query de Tickets (su orden se reemplaza por actividad DESC, id DESC)
+        page_size: Filas por página
+        cursor: Cursor del primer ('prev') o último ('next') ticket de la página actual
+        direction: 'next' o 'prev'
+        
+    Returns:
+        list: Tickets de la página en el orden del listado
+    """
+    from models.tickets import Tickets
+    
+    query = query.order_by(None).filter(keyset_condition(cursor, direction))
+    if direction == 'prev':
+        # Se leen hacia atrás las filas más cercanas al cursor y se devuelven en orden
+        activity_expression = Tickets.get_activity_expression()
+        items = query.order_by(activity_expression.asc(), Tickets.id_ticket.asc()).limit(page_size).all()
+        return list(reversed(items))
+    
+    return query.order_by(
+        Tickets.get_latest_activity_expression(), Tickets.id_ticket.desc()
+    ).limit(page_size).all()
+
+
+def build_pagination(page, page_size, total_count, items=(), estimated=False):
+    """
+    Diccionario 'pagination' de los listados, con los cursores de la página
+    anterior y siguiente para navegar sin OFFSET. 'estimated' indica que el
+    total viene de las estadísticas del planificador (ver services.listing_counts).
+    """
+    total_pages = math.ceil(total_count / page_size)
+    has_prev = page > 1
+    has_next = page < total_pages
+    return {
+        'page': page,
+        'pages': total_pages,
+        'per_page': page_size,
+        'total': total_count,
+        'has_prev': has_prev,
+        'has_next': has_next,
+        'prev_num': page - 1 if has_prev else None,
+        'next_num': page + 1 if has_next else None,
+        'prev_cursor': encode_keyset_cursor(items[0]) if has_prev and items else None,
+        'next_cursor': encode_keyset_cursor(items[-1]) if has_next and items else None,
+        'estimated': estimated
+    }
+
 
 class PaginationService:
-    def __init__(self, query, page_size=50, max_page_size=200):
+    def __init__(self, query, page_size=50, max_page_size=200, ticket_type=None, count_mode=None):
         """
         Inicializa el servicio de paginación
         
@@ -16,18 +151,29 @@ class PaginationService:
             query: Query de SQLAlchemy
             page_size: Tamaño de página por defecto
             max_page_size: Tamaño máximo de página permitido
+            ticket_type: Tipo de ticket del listado; si se indica, el total se
+                cachea por filtros hasta la siguiente escritura de ese tipo
+            count_mode: 'exact', 'estimated' o 'window' (None = Config.LISTING_COUNT_MODE).
+                'window' trae la página y el total en una sola sentencia (COUNT(*) OVER ())
         """
         self.base_query = query
         self.page_size = min(page_size, max_page_size)
         self.max_page_size = max_page_size
+        self.ticket_type = ticket_type
+        self.count_mode = count_mode
     
-    def get_paginated_data(self, page=1, filters=None):
+    def get_paginated_data(self, page=1, filters=None, cursor=None, direction='next'):
         """
         Obtiene datos paginados con filtros opcionales
         
+        Con un cursor (prev_cursor/next_cursor de la página actual) la página se lee
+        por keyset (actividad, id_ticket) en vez de OFFSET; el query debe ser de Tickets.
+        
         Args:
-            page: Número de página (1-indexed)
+            page: Número de página (1-indexed) que se va a mostrar
             filters: Diccionario con filtros a aplicar
+            cursor: Cursor de la página vecina (opcional)
+            direction: 'next' o 'prev' según el cursor
             
         Returns:
             Dict con datos paginados y metadatos
@@ -38,47 +184,86 @@ class PaginationService:
             if filters:
                 query = self._apply_filters(query, filters)
             
-            # Contar total de registros (optimizado)
-            total_count = query.count()
+            # Página y total en un solo viaje a la base de datos (solo por OFFSET:
+            # con cursor la ventana contaría solo las filas posteriores al cursor)
+            items = None
+            total_count = None
+            estimated = False
+            if not cursor and resolve_count_mode(self.count_mode) == 'window':
+                items, total_count = self._get_page_with_total(query, max(1, page), filters)
             
-            # Calcular paginación
+            if total_count is None:
+                # Contar total de registros (cacheado por filtros cuando se conoce el tipo)
+                if self.ticket_type is not None:
+                    total_count, estimated = get_listing_count(query, self.ticket_type, filters, self.count_mode)
+                else:
+                    total_count = query.count()
+            
+            # Calcular paginación (un total estimado no limita la página pedida)
             total_pages = math.ceil(total_count / self.page_size)
-            page = max(1, min(page, total_pages))  # Asegurar página válida
-            offset = (page - 1) * self.page_size
+            page = max(1, page if estimated else min(page, total_pages))  # Asegurar página válida
             
-            # Obtener datos de la página actual
-            items = query.offset(offset).limit(self.page_size).all()
+            # Obtener datos de la página actual (keyset si hay cursor, OFFSET si no)
+            if cursor:
+                try:
+                    items = get_keyset_items(query, self.page_size, cursor, direction)
+                except ValueError as e:
+                    print(f"Error en paginación por cursor: {e}")
+            if items is None:
+                offset = (page - 1) * self.page_size
+                items = query.offset(offset).limit(self.page_size).all()
             
             return {
                 'items': items,
-                'pagination': {
-                    'page': page,
-                    'pages': total_pages,
-                    'per_page': self.page_size,
-                    'total': total_count,
-                    'has_prev': page > 1,
-                    'has_next': page < total_pages,
-                    'prev_num': page - 1 if page > 1 else None,
-                    'next_num': page + 1 if page < total_pages else None
-                }
+                'pagination': build_pagination(page, self.page_size, total_count, items, estimated)
             }
             
         except Exception as e:
             print(f"Error en paginación: {e}")
             return {
                 'items': [],
-                'pagination': {
-                    'page': 1,
-                    'pages': 0,
-                    'per_page': self.page_size,
-                    'total': 0,
-                    'has_prev': False,
-                    'has_next': False,
-                    'prev_num': None,
-                    'next_num': None
-                }
+                'pagination': build_pagination(1, self.page_size, 0)
             }
     
+    def _get_page_with_total(self, query, page, filters=None):
+        """
+        Lee la página por OFFSET junto con COUNT(*) OVER (): el total viaja en cada fila
+        
+        Returns:
+            tuple: (items, total), o (None, None) si hay que contar aparte: motor sin
+            funciones de ventana (ej. SQLite < 3.25) o página fuera de rango (sin filas
+            no hay total)
+        """
+        try:
+            if not supports_window_functions(query.session.get_bind(clause=query.statement)):
+                return None, None
+            
+            # La clave se toma antes de leer, así un total viejo no queda bajo una generación nueva
+            count_key = listing_count_key(self.ticket_type, filters) if self.ticket_type is not None else None
+            
+            offset = (page - 1) * self.page_size
+            rows = query.add_columns(
+                func.count().over().label('total_count')
+            ).offset(offset).limit(self.page_size).all()
+        except Exception as e:
+            print(f"Error en paginación con COUNT(*) OVER (): {e}")
+            return None, None
+        
+        if not rows:
+            # La página 1 vacía significa listado vacío; más adelante no se sabe el total
+            return ([], 0) if page == 1 else (None, None)
+        
+        total_count = rows[0][-1]
+        if count_key is not None:
+            # Los cursores de las páginas siguientes reutilizan este total sin contar
+            from services.cache_manager import get_cache_manager
+            get_cache_manager().set(
+                count_key, total_count, ttl=COUNT_CACHE_TTL, tags=listing_count_tags(self.ticket_type)
+            )
+        if len(rows[0]) == 2:
+            return [row[0] for row in rows], total_count
+        return [tuple(row[:-1]) for row in rows], total_count
+    
     def _apply_filters(self, query, filters):
         """
         Aplica filtros al query de manera optimizada
@@ -90,56 +275,18 @@ class PaginationService:
         - city: Ciudad específica
         - date_from/date_to: Rango de fechas
         """
-        for field, value in filters.items():
-            if value and str(value).strip():  # Solo aplicar si hay valor
-                
-                if field == 'search':
-                    # 🔍 BÚSQUEDA OPTIMIZADA en múltiples campos
-                    search_term = f"%{value.strip()}%"
-                    query = query.filter(
-                        text("""(
-                            IMEI LIKE :search OR 
-                            product_code LIKE :search OR 
-                            technical_name LIKE :search OR
-                            document_client LIKE :search OR
-                            CAST(id_ticket AS VARCHAR) LIKE :search
-                        )""")
-                    ).params(search=search_term)
-                
-                elif field == 'state':
-                    # 🎯 FILTRO POR ESTADO ESPECÍFICO
-                    query = query.filter(text("state = :state")).params(state=value)
-                
-                elif field == 'state_not':
-                    # ❌ EXCLUIR ESTADO ESPECÍFICO (para filtro "Activos")
-                    query = query.filter(text("state != :state_not")).params(state_not=value)
-                
-                elif field == 'city':
-                    # 🏙️ FILTRO POR CIUDAD (manejo especial para tildes)
-                    city_value = value.lower()
-                    if city_value in ['medellin', 'medellín']:
-                        query = query.filter(text("LOWER(city) LIKE '%medell%'"))
-                    elif city_value in ['bogota', 'bogotá']:
-                        query = query.filter(text("LOWER(city) LIKE '%bogot%'"))
-                    else:
-                        query = query.filter(text("LOWER(city) LIKE LOWER(:city)")).params(city=f"%{value}%")
-                
-                elif field == 'date_from':
-                    # 📅 FILTRO FECHA DESDE
-                    query = query.filter(text("creation_date >= :date_from")).params(date_from=value)
-                
-                elif field == 'date_to':
-                    # 📅 FILTRO FECHA HASTA
-                    query = query.filter(text("creation_date <= :date_to")).params(date_to=value)
-                
-                elif field == 'priority':
-                    # ⚡ FILTRO POR PRIORIDAD
-                    query = query.filter(text("priority = :priority")).params(priority=value)
+        from services.listing_engine import get_listing_engine
+        
+        # Condiciones con bindparam cacheadas por combinación de filtros (ver listing_engine);
+        # aquí solo se enlazan los valores de esta petición
+        conditions, params = get_listing_engine().filter_conditions(filters)
+        if conditions:
+            query = query.filter(*conditions).params(**params)
         
         return query
 
 
-def get_paginated_tickets(ticket_type="1", page=1, filters=None):
+def get_paginated_tickets(ticket_type="1", page=1, filters=None, cursor=None, direction='next'):
     """
     Función de conveniencia para obtener tickets paginados
     
@@ -147,6 +294,8 @@ def get_paginated_tickets(ticket_type="1", page=1, filters=None):
         ticket_type: Tipo de ticket ("1" para reparación interna, "2" para garantía, etc.)
         page: Número de página
         filters: Filtros a aplicar
+        cursor: Cursor de la página vecina para paginar por keyset (opcional)
+        direction: 'next' o 'prev'
         
     Returns:
         Datos paginados
@@ -155,76 +304,59 @@ def get_paginated_tickets(ticket_type="1", page=1, filters=None):
     from models.tickets import Tickets
     
     # 🎯 QUERY BASE FILTRADO POR type_of_service - ORDENADO POR ACTIVIDAD MÁS RECIENTE
-    base_query = Tickets.query.filter(Tickets.type_of_service == ticket_type).order_by(Tickets.get_latest_activity_expression())
-    
-    # 🔧 APLICAR FILTROS
-    if filters:
-        for field, value in filters.items():
-            if value and str(value).strip():
-                if field == 'search':
-                    # 🔍 BÚSQUEDA en campos del modelo de tickets normal
-                    search_term = f"%{value.strip()}%"
-                    base_query = base_query.filter(
-                        (Tickets.IMEI.ilike(search_term)) |
-                        (Tickets.technical_name.ilike(search_term)) |
-                        (Tickets.reference.ilike(search_term)) |
-                        (Tickets.document_client.ilike(search_term))
-                    )
-                elif field == 'state':
-                    base_query = base_query.filter(Tickets.state == value)
-                elif field == 'state_not':
-                    base_query = base_query.filter(Tickets.state != value)
-                elif field == 'city':
-                    city_value = value.lower()
-                    if city_value in ['medellin', 'medellín']:
-                        base_query = base_query.filter(Tickets.city.ilike('%medell%'))
-                    elif city_value in ['bogota', 'bogotá']:
-                        base_query = base_query.filter(Tickets.city.ilike('%bogot%'))
-                    else:
-                        base_query = base_query.filter(Tickets.city == value)
+    base_query = Tickets.query.filter(Tickets.type_of_service == ticket_type).order_by(
+        Tickets.get_latest_activity_expression(), Tickets.id_ticket.desc()
+    )
     
-    pagination_service = PaginationService(base_query, page_size=20)
-    return pagination_service.get_paginated_data(page, {})
+    # 🔧 FILTROS: los aplica PaginationService, así también forman la clave del conteo cacheado
+    pagination_service = PaginationService(base_query, page_size=20, ticket_type=ticket_type)
+    return pagination_service.get_paginated_data(page, filters, cursor, direction)
 
 
-def get_paginated_technical_service(page=1, filters=None):
+def get_paginated_technical_service(page=1, filters=None, cursor=None, direction='next'):
     """
     Función específica para servicio técnico con filtros optimizados
     
     Args:
         page: Número de página
         filters: Dict con filtros {'search': str, 'state': str, 'city': str, 'state_not': str}
+        cursor: Cursor de la página vecina para paginar por keyset (opcional)
+        direction: 'next' o 'prev'
     """
     from models.tickets import Tickets as TechnicalTickets
     
     # 🎯 QUERY BASE OPTIMIZADO: Solo tickets de servicio técnico (type_of_service="0")
     base_query = TechnicalTickets.query.filter_by(type_of_service="0").order_by(
-        TechnicalTickets.get_latest_activity_expression()  # Ordenado por actividad más reciente
+        TechnicalTickets.get_latest_activity_expression(),  # Ordenado por actividad más reciente
+        TechnicalTickets.id_ticket.desc()
     )
     
     # 🔧 SERVICIO DE PAGINACIÓN CON TAMAÑO OPTIMIZADO
-    pagination_service = PaginationService(base_query, page_size=20)  # 20 tickets por página
-    return pagination_service.get_paginated_data(page, filters)
+    pagination_service = PaginationService(base_query, page_size=20, ticket_type="0")  # 20 tickets por página
+    return pagination_service.get_paginated_data(page, filters, cursor, direction)
 
 
-def get_paginated_warranties(page=1, filters=None):
+def get_paginated_warranties(page=1, filters=None, cursor=None, direction='next'):
     """
     Función específica para garantías con filtros optimizados
     
     Args:
         page: Número de página
         filters: Dict con filtros {'search': str, 'state': str, 'city': str, 'state_not': str}
+        cursor: Cursor de la página vecina para paginar por keyset (opcional)
+        direction: 'next' o 'prev'
     """
     from models.tickets import Tickets as WarrantyTickets
     
     # 🎯 QUERY BASE OPTIMIZADO: Solo tickets de garantía (type_of_service="2")
     base_query = WarrantyTickets.query.filter_by(type_of_service="2").order_by(
-        WarrantyTickets.get_latest_activity_expression()  # Ordenado por actividad más reciente
+        WarrantyTickets.get_latest_activity_expression(),  # Ordenado por actividad más reciente
+        WarrantyTickets.id_ticket.desc()
     )
     
     # 🔧 SERVICIO DE PAGINACIÓN CON TAMAÑO OPTIMIZADO
-    pagination_service = PaginationService(base_query, page_size=20)  # 20 tickets por página
-    return pagination_service.get_paginated_data(page, filters)
+    pagination_service = PaginationService(base_query, page_size=20, ticket_type="2")  # 20 tickets por página
+    return pagination_service.get_paginated_data(page, filters, cursor, direction)
 
 
 class LazyLoader:
@@ -0,0 +1,362 @@
+"""
+Índice de sugerencias (typeahead) para la caja de búsqueda de tickets
+Índices de prefijos en memoria (claves ordenadas + bisect) para IMEI, documento del
+cliente, referencia y código de producto.
+Responden en milisegundos sin consultar la base de datos y se actualizan con cada escritura.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from models import db
+from models.tickets import Tickets
+
+# Campo de Tickets -> campo del lenguaje de búsqueda (services.search_query)
+SUGGESTION_FIELDS = {
+    'IMEI': 'imei',
+    'document_client': 'doc',
+    'reference': 'ref',
+    'product_code': 'code',
+}
+
+DEFAULT_SUGGESTION_LIMIT = 10
+
+# Tamaño del bloque de lectura al construir los tries
+BUILD_BATCH_SIZE = 5000
+
+# Segundos entre intentos de construcción si la base de datos no responde al arrancar
+BUILD_RETRY_INTERVAL = 60
+
+
+class PrefixTrie:
+    """
+    Índice de prefijos con conteo por valor.
+
+    En lugar de un nodo por carácter guarda las claves normalizadas en una lista
+    ordenada: los valores que empiezan por un prefijo forman un tramo contiguo que
+    se ubica con bisect, y cada valor ocupa una sola cadena.
+
+    Un mismo valor puede pertenecer a varios tickets (ej. un documento de cliente),
+    por eso cada clave cuenta cuántos tickets la tienen y solo desaparece
+    cuando se elimina el último.
+    """
+
+    def __init__(self):
+        self.keys: List[str] = []
+        # clave normalizada -> [valor original, número de tickets]
+        self.entries: Dict[str, list] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def normalize(value) -> str:
+        """Clave del índice: sin espacios en los extremos y sin distinguir mayúsculas"""
+        if value is None:
+            return ''
+        return str(value).strip().lower()
+
+    def _count(self, value) -> Optional[str]:
+        """Suma una ocurrencia; retorna la clave si es nueva (aún no está en keys)"""
+        key = self.normalize(value)
+        if not key:
+            return None
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry[1] += 1
+            return None
+        display = str(value).strip()
+        # La mayoría de valores (IMEI, documentos) ya están normalizados: una sola cadena
+        self.entries[key] = [key if display == key else display, 1]
+        return key
+
+    def add(self, value):
+        """Agrega una ocurrencia del valor"""
+        key = self._count(value)
+        if key is not None:
+            insort(self.keys, key)
+
+    def add_unsorted(self, value):
+        """Agrega una ocurrencia sin ordenar las claves (construcción inicial, ver sort_keys)"""
+        self._count(value)
+
+    def sort_keys(self):
+        """Ordena las claves una sola vez después de add_unsorted"""
+        self.keys = sorted(self.entries)
+
+    def remove(self, value):
+        """Elimina una ocurrencia del valor (y la clave cuando era la última)"""
+        key = self.normalize(value)
+        entry = self.entries.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1]:
+            return
+        del self.entries[key]
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+
+    def complete(self, prefix, limit=DEFAULT_SUGGESTION_LIMIT) -> List[Tuple[str, int]]:
+        """
+        Valores que empiezan por el prefijo, en orden alfabético
+
+        Returns:
+            list: Hasta ``limit`` tuplas (valor, número de tickets)
+        """
+        key_prefix = self.normalize(prefix)
+        keys = self.keys
+        results = []
+        position = bisect_left(keys, key_prefix)
+        while position < len(keys) and len(results) < limit:
+            key = keys[position]
+            if not key.startswith(key_prefix):
+                break
+            value, count = self.entries[key]
+            results.append((value, count))
+            position += 1
+        return results
+
+
+class SuggestionIndex:
+    """Un trie por campo y tipo de ticket, sincronizado con services.ticket_events"""
+
+    def __init__(self, fields=tuple(SUGGESTION_FIELDS)):
+        self.fields = fields
+        self.tries: Dict[str, Dict[str, PrefixTrie]] = {field: {} for field in fields}
+        self.lock = threading.RLock()
+        self.ready = False
+        self.building = False
+        # Cambios publicados mientras se construyen los tries (se aplican al terminar)
+        self.pending = []
+        self.built_at = None
+        self.build_time = None
+        self.build_attempts = 0
+        self.last_error = None
+
+    def _trie(self, tries, field, ticket_type) -> PrefixTrie:
+        by_type = tries[field]
+        key = str(ticket_type)
+        if key not in by_type:
+            by_type[key] = PrefixTrie()
+        return by_type[key]
+
+    def start_build(self):
+        """Marca el inicio de una construcción: los cambios siguientes se guardan para aplicarlos después"""
+        with self.lock:
+            self.building = True
+            self.pending = []
+            self.build_attempts += 1
+
+    def build_from_database(self):
+        """Construye los tries leyendo solo las columnas sugeridas de Tickets"""
+        with self.lock:
+            # init_suggestion_index ya la marca antes de lanzar el hilo
+            if not self.building:
+                self.start_build()
+        try:
+            self._build_from_database()
+        except Exception as e:
+            with self.lock:
+                self.last_error = str(e)
+            raise
+        finally:
+            with self.lock:
+                self.building = False
+                self.pending = []
+
+    def _build_from_database(self):
+        start_time = time.time()
+        columns = [getattr(Tickets, field) for field in self.fields]
+        query = db.session.query(
+            Tickets.type_of_service, *columns
+        ).execution_options(yield_per=BUILD_BATCH_SIZE)
+
+        tries = {field: {} for field in self.fields}
+        for row in query:
+            for field, value in zip(self.fields, row[1:]):
+                self._trie(tries, field, row[0]).add_unsorted(value)
+        # Las claves se ordenan una sola vez al final
+        for by_type in tries.values():
+            for trie in by_type.values():
+                trie.sort_keys()
+
+        with self.lock:
+            self.tries = tries
+            pending, self.pending = self.pending, []
+            for action, snapshot in pending:
+                self._apply_unlocked(action, snapshot)
+            self.ready = True
+            self.last_error = None
+            self.built_at = time.time()
+            self.build_time = self.built_at - start_time
+
+    def _apply_unlocked(self, action, snapshot):
+        previous = snapshot.get('_previous', {})
+        old_type = previous.get('type_of_service', snapshot.get('type_of_service'))
+        new_type = snapshot.get('type_of_service')
+
+        for field in self.fields:
+            if action == 'insert':
+                self._trie(self.tries, field, new_type).add(snapshot.get(field))
+            elif action == 'delete':
+                self._trie(self.tries, field, new_type).remove(snapshot.get(field))
+            elif field in previous or old_type != new_type:
+                self._trie(self.tries, field, old_type).remove(previous.get(field, snapshot.get(field)))
+                self._trie(self.tries, field, new_type).add(snapshot.get(field))
+
+    def apply_change(self, action: str, snapshot: Dict[str, object]):
+        """Aplica un cambio publicado por services.ticket_events"""
+        with self.lock:
+            if self.building:
+                self.pending.append((action, dict(snapshot)))
+            if self.ready:
+                self._apply_unlocked(action, snapshot)
+
+    def suggest(self, prefix, field=None, ticket_type=None,
+                limit=DEFAULT_SUGGESTION_LIMIT) -> List[Dict[str, object]]:
+        """
+        Sugerencias para un prefijo
+
+        Args:
+            prefix (str): Lo que el usuario lleva escrito
+            field (str, optional): Campo de Tickets a completar (None = todos)
+            ticket_type (str, optional): Tipo de ticket (None = todos los tipos)
+            limit (int): Máximo de sugerencias
+
+        Returns:
+            list: Dicts con field, value, count y query (término listo para buscar)
+        """
+        fields = [field] if field else list(self.fields)
+        suggestions = []
+
+        with self.lock:
+            for name in fields:
+                if name not in self.tries:
+                    continue
+                if ticket_type is None:
+                    tries = list(self.tries[name].values())
+                else:
+                    tries = [self.tries[name].get(str(ticket_type))]
+
+                # Fusionar los tipos sumando los conteos de un mismo valor
+                counts = {}
+                for trie in tries:
+                    if trie is None:
+                        continue
+                    for value, count in trie.complete(prefix, limit):
+                        key = PrefixTrie.normalize(value)
+                        if key in counts:
+                            counts[key] = (counts[key][0], counts[key][1] + count)
+                        else:
+                            counts[key] = (value, count)
+
+                for key in sorted(counts)[:limit]:
+                    value, count = counts[key]
+                    suggestions.append({
+                        'field': name,
+                        'value': value,
+                        'count': count,
+                        'query': _suggestion_query(name, value),
+                    })
+
+        return suggestions[:limit]
+
+    def get_stats(self) -> Dict[str, object]:
+        """Retorna estadísticas del índice"""
+        with self.lock:
+            return {
+                'ready': self.ready,
+                'building': self.building,
+                'values': {
+                    field: sum(trie.size for trie in by_type.values())
+                    for field, by_type in self.tries.items()
+                },
+                'built_at': self.built_at,
+                'build_time': self.build_time,
+                'build_attempts': self.build_attempts,
+                'last_error': self.last_error,
+            }
+
+
+def _suggestion_query(field, value):
+    """Término de búsqueda por campo que corresponde a la sugerencia"""
+    if ' ' in value:
+        return f'{SUGGESTION_FIELDS[field]}:"{value}"'
+    return f'{SUGGESTION_FIELDS[field]}:{value}'
+
+
+# Instancia global del índice
+_suggestion_index = None
+
+
+def get_suggestion_index() -> SuggestionIndex:
+    """Obtiene la instancia global del índice de sugerencias"""
+    global _suggestion_index
+    if _suggestion_index is None:
+        _suggestion_index = SuggestionIndex()
+    return _suggestion_index
+
+
+def resolve_suggestion_field(name) -> Optional[str]:
+    """Convierte un alias del lenguaje de búsqueda (imei, doc, ref, code...) al campo de Tickets"""
+    from services.search_query import FIELD_ALIASES
+
+    alias = FIELD_ALIASES.get((name or '').lower())
+    for field, search_field in SUGGESTION_FIELDS.items():
+        if search_field == alias:
+            return field
+    return None
+
+
+def _build_in_background(app, index, retry_interval):
+    """Construye los tries; si falla (ej. la base de datos no responde) lo reintenta"""
+    while True:
+        try:
+            with app.app_context():
+                index.build_from_database()
+            print(f"Índice de sugerencias construido en {index.build_time:.2f}s")
+            return
+        except Exception as e:
+            # Mientras tanto las sugerencias responden vacías con ready=False
+            print(f"Error construyendo índice de sugerencias (reintento en {retry_interval}s): {e}")
+        time.sleep(retry_interval)
+        index.start_build()
+
+
+def init_suggestion_index(background=True) -> bool:
+    """
+    Construye los tries y los mantiene al día con las escrituras de tickets.
+    Por defecto los construye en un hilo que reintenta cada BUILD_RETRY_INTERVAL
+    segundos si falla: el arranque no espera a la base de datos.
+    Debe llamarse dentro de un contexto de aplicación.
+
+    Returns:
+        bool: True si la construcción empezó (o terminó, con background=False)
+    """
+    from flask import current_app
+    from services.ticket_events import on_ticket_change
+
+    index = get_suggestion_index()
+    on_ticket_change(index.apply_change)
+
+    if background:
+        index.start_build()
+        threading.Thread(
+            target=_build_in_background,
+            args=(current_app._get_current_object(), index,
+                  current_app.config.get('SUGGESTION_RETRY_INTERVAL', BUILD_RETRY_INTERVAL)),
+            name='suggestion-index-build', daemon=True
+        ).start()
+        return True
+
+    try:
+        index.build_from_database()
+        print(f"Índice de sugerencias construido en {index.build_time:.2f}s")
+        return True
+    except Exception as e:
+        print(f"Error construyendo índice de sugerencias: {e}")
+        return False
@@ -0,0 +1,325 @@
+"""
+Backends de búsqueda de texto para SearchService
+Cada backend traduce un término de búsqueda a una condición SQL sobre Tickets
+y mantiene su propio índice sincronizado con las escrituras de la tabla.
+
+Backends disponibles (Config.SEARCH_BACKEND):
+- ilike:    OR de ILIKE '%term%' sobre todos los campos (recorrido completo)
+- trigram:  índice de trigramas en memoria, con ILIKE como respaldo
+- fts5:     tabla virtual FTS5 sincronizada por triggers (SQLite)
+- tsvector: columna tsvector generada con índice GIN (PostgreSQL)
+- auto:     fts5 en SQLite, tsvector en PostgreSQL, trigram en otros motores
+"""
+import re
+import threading
+
+from flask import current_app
+from sqlalchemy import or_, func, text, literal_column, bindparam
+
+from models import db
+from models.tickets import Tickets
+
+# Campos de texto cubiertos por la búsqueda (además del id del ticket)
+SEARCH_FIELDS = (
+    'technical_name',
+    'reference',
+    'priority',
+    'document_client',
+    'IMEI',
+    'product_code',
+    'city',
+    'state',
+)
+
+# Los backends con índice en la base de datos cubren también el comentario
+# (texto largo: en el índice en memoria o con ILIKE costaría demasiado)
+FULL_TEXT_FIELDS = SEARCH_FIELDS + ('comment',)
+
+# Configuración de texto de PostgreSQL: 'simple' sin tildes (extensión unaccent)
+TSVECTOR_CONFIG = 'tickets_unaccent'
+
+DEFAULT_SEARCH_BACKEND = 'trigram'
+
+_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def get_tickets_engine():
+    """Obtiene el engine del bind donde vive la tabla Tickets"""
+    return db.session.get_bind(mapper=Tickets.__mapper__)
+
+
+def tokenize_term(term):
+    """Divide el término en palabras sin caracteres especiales del motor de búsqueda"""
+    return _TOKEN_PATTERN.findall(term or '')
+
+
+class SearchBackend:
+    """Interfaz común de los backends de búsqueda"""
+
+    name = 'base'
+
+    def setup(self):
+        """Crea o verifica las estructuras del índice. Se llama una vez al arrancar."""
+
+    def build_condition(self, term, ticket_type=None):
+        """
+        Construye la condición SQL para el término de búsqueda
+
+        Args:
+            term (str): Término de búsqueda ya limpio
+            ticket_type (str, optional): Tipo de ticket que se está buscando
+
+        Returns:
+            Expresión SQLAlchemy para filter(), o None si no hay coincidencias posibles
+        """
+        raise NotImplementedError
+
+
+class IlikeSearchBackend(SearchBackend):
+    """Recorrido ILIKE '%term%' sobre todos los campos (comportamiento original)"""
+
+    name = 'ilike'
+
+    def build_condition(self, term, ticket_type=None):
+        search_pattern = f"%{term}%"
+        return or_(
+            func.cast(Tickets.id_ticket, db.String).ilike(search_pattern),
+            *[getattr(Tickets, field).ilike(search_pattern) for field in SEARCH_FIELDS]
+        )
+
+
+class TrigramSearchBackend(SearchBackend):
+    """Índice de trigramas en memoria; usa ILIKE cuando el índice no puede resolver"""
+
+    name = 'trigram'
+
+    # Ids por cada IN (...): un conjunto grande de candidatos se envía en varios bloques
+    # unidos con OR, con los valores literales para no agotar los parámetros del driver
+    in_batch_size = 1000
+
+    def __init__(self):
+        self.fallback = IlikeSearchBackend()
+
+    def setup(self):
+        from services.trigram_index import init_trigram_index
+        init_trigram_index()
+
+    def build_condition(self, term, ticket_type=None):
+        from services.trigram_index import get_trigram_index
+
+        candidate_ids = get_trigram_index().search(term, ticket_type)
+        if candidate_ids is None:
+            return self.fallback.build_condition(term, ticket_type)
+        if not candidate_ids:
+            return None
+        if len(candidate_ids) <= self.in_batch_size:
+            return Tickets.id_ticket.in_(candidate_ids)
+        return or_(*[
+            Tickets.id_ticket.in_(bindparam(
+                None, candidate_ids[start:start + self.in_batch_size],
+                expanding=True, literal_execute=True
+            ))
+            for start in range(0, len(candidate_ids), self.in_batch_size)
+        ])
+
+
+class SQLiteFTS5SearchBackend(SearchBackend):
+    """
+    Tabla virtual FTS5 con contenido externo sobre Tickets.
+    Los triggers de INSERT/UPDATE/DELETE la mantienen sincronizada.
+    """
+
+    name = 'fts5'
+    fts_table = 'tickets_fts'
+
+    def __init__(self):
+        self.fallback = IlikeSearchBackend()
+        schema = Tickets.__table__.schema
+        self.prefix = f'{schema}.' if schema else ''
+
+    def setup(self):
+        columns = ('id_ticket',) + FULL_TEXT_FIELDS
+        column_list = ', '.join(f'"{c}"' for c in columns)
+        new_values = ', '.join(f'new."{c}"' for c in columns)
+        old_values = ', '.join(f'old."{c}"' for c in columns)
+        source = Tickets.__tablename__
+        fts = self.fts_table
+
+        engine = get_tickets_engine()
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text(f"SELECT 1 FROM {self.prefix}sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': fts}
+            ).first()
+
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.prefix}{fts} USING fts5("
+                f"{column_list}, content='{source}', content_rowid='id_ticket', "
+                f"tokenize='unicode61 remove_diacritics 2')"
+            ))
+            conn.execute(text(
+                f'CREATE TRIGGER IF NOT EXISTS {self.prefix}{fts}_ai AFTER INSERT ON "{source}" BEGIN '
+                f'INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id_ticket, {new_values}); END'
+            ))
+            conn.execute(text(
+                f'CREATE TRIGGER IF NOT EXISTS {self.prefix}{fts}_ad AFTER DELETE ON "{source}" BEGIN '
+                f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id_ticket, {old_values}); END"
+            ))
+            conn.execute(text(
+                f'CREATE TRIGGER IF NOT EXISTS {self.prefix}{fts}_au AFTER UPDATE ON "{source}" BEGIN '
+                f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id_ticket, {old_values}); "
+                f'INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id_ticket, {new_values}); END'
+            ))
+
+            # Indexar las filas existentes solo la primera vez
+            if not exists:
+                conn.execute(text(f"INSERT INTO {self.prefix}{fts}({fts}) VALUES ('rebuild')"))
+
+    def build_condition(self, term, ticket_type=None):
+        tokens = tokenize_term(term)
+        if not tokens:
+            return self.fallback.build_condition(term, ticket_type)
+
+        # Cada palabra como prefijo: "medell"* AND "pantalla"*
+        fts_query = ' '.join(f'"{token}"*' for token in tokens)
+        return Tickets.id_ticket.in_(
+            text(
+                f"SELECT rowid FROM {self.prefix}{self.fts_table} "
+                f"WHERE {self.fts_table} MATCH :fts_query"
+            ).bindparams(fts_query=fts_query)
+        )
+
+
+class PostgresTsvectorSearchBackend(SearchBackend):
+    """
+    Columna tsvector generada (se recalcula sola en INSERT/UPDATE) con índice GIN.
+    Requiere PostgreSQL 12 o superior.
+    """
+
+    name = 'tsvector'
+    vector_column = 'search_vector'
+    index_name = 'idx_tickets_search_vector'
+
+    def __init__(self):
+        self.fallback = IlikeSearchBackend()
+
+    def _table_name(self, engine):
+        return engine.dialect.identifier_preparer.format_table(Tickets.__table__)
+
+    def _setup_config(self, conn):
+        """Crea la configuración 'simple' + unaccent para que "medellin" encuentre "Medellín" """
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+        exists = conn.execute(
+            text("SELECT 1 FROM pg_ts_config WHERE cfgname = :name"), {'name': TSVECTOR_CONFIG}
+        ).first()
+        if not exists:
+            conn.execute(text(f"CREATE TEXT SEARCH CONFIGURATION {TSVECTOR_CONFIG} (COPY = simple)"))
+            conn.execute(text(
+                f"ALTER TEXT SEARCH CONFIGURATION {TSVECTOR_CONFIG} "
+                f"ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple"
+            ))
+
+    def setup(self):
+        engine = get_tickets_engine()
+        table_name = self._table_name(engine)
+        document = " || ' ' || ".join(
+            ['"id_ticket"::text'] + [f"coalesce(\"{field}\", '')" for field in FULL_TEXT_FIELDS]
+        )
+
+        with engine.begin() as conn:
+            self._setup_config(conn)
+
+            # Una columna creada con otra configuración (ej. 'simple') se vuelve a crear
+            expression = conn.execute(
+                text(
+                    "SELECT generation_expression FROM information_schema.columns "
+                    "WHERE table_schema = :schema AND table_name = :table AND column_name = :column"
+                ),
+                {
+                    'schema': Tickets.__table__.schema or 'public',
+                    'table': Tickets.__tablename__,
+                    'column': self.vector_column,
+                }
+            ).scalar()
+            if expression is not None and TSVECTOR_CONFIG not in expression:
+                conn.execute(text(f"ALTER TABLE {table_name} DROP COLUMN {self.vector_column}"))
+
+            conn.execute(text(
+                f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {self.vector_column} tsvector "
+                f"GENERATED ALWAYS AS (to_tsvector('{TSVECTOR_CONFIG}'::regconfig, {document})) STORED"
+            ))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {self.index_name} "
+                f"ON {table_name} USING GIN ({self.vector_column})"
+            ))
+        self.column = literal_column(f"{table_name}.{self.vector_column}")
+
+    def build_condition(self, term, ticket_type=None):
+        tokens = tokenize_term(term)
+        if not tokens:
+            return self.fallback.build_condition(term, ticket_type)
+
+        # Cada palabra como prefijo: medell:* & pantalla:* (la configuración quita las tildes)
+        ts_query = ' & '.join(f"{token.lower()}:*" for token in tokens)
+        return self.column.op('@@')(
+            func.to_tsquery(literal_column(f"'{TSVECTOR_CONFIG}'::regconfig"), ts_query)
+        )
+
+
+SEARCH_BACKENDS = {
+    IlikeSearchBackend.name: IlikeSearchBackend,
+    TrigramSearchBackend.name: TrigramSearchBackend,
+    SQLiteFTS5SearchBackend.name: SQLiteFTS5SearchBackend,
+    PostgresTsvectorSearchBackend.name: PostgresTsvectorSearchBackend,
+}
+
+# Backend activo del proceso
+_search_backend = None
+_backend_lock = threading.Lock()
+
+
+def _resolve_backend_name(name):
+    if name != 'auto':
+        return name
+    dialect = get_tickets_engine().dialect.name
+    if dialect == 'sqlite':
+        return SQLiteFTS5SearchBackend.name
+    if dialect == 'postgresql':
+        return PostgresTsvectorSearchBackend.name
+    return TrigramSearchBackend.name
+
+
+def init_search_backend(name=None) -> SearchBackend:
+    """
+    Inicializa el backend configurado en Config.SEARCH_BACKEND.
+    Debe llamarse dentro de un contexto de aplicación.
+    Si el backend no puede prepararse se usa ILIKE.
+
+    Returns:
+        SearchBackend: Backend activo
+    """
+    global _search_backend
+    if name is None:
+        name = current_app.config.get('SEARCH_BACKEND', DEFAULT_SEARCH_BACKEND)
+
+    with _backend_lock:
+        try:
+            name = _resolve_backend_name(str(name).lower())
+            backend_class = SEARCH_BACKENDS.get(name)
+            if backend_class is None:
+                raise ValueError(f"Backend de búsqueda desconocido: {name}")
+            backend = backend_class()
+            backend.setup()
+        except Exception as e:
+            print(f"Error inicializando backend de búsqueda '{name}': {e}")
+            backend = IlikeSearchBackend()
+
+        _search_backend = backend
+        return backend
+
+
+def get_search_backend() -> SearchBackend:
+    """Obtiene el backend de búsqueda activo (lo inicializa si hace falta)"""
+    if _search_backend is None:
+        return init_search_backend()
+    return _search_backend
@@ -0,0 +1,177 @@
+"""
+Lenguaje de búsqueda por campos para SearchService
+Convierte términos como  imei:35678  doc:1020  id:4512  state:"En proceso"  city:medellin
+en un plan de consulta que usa búsquedas por clave primaria e índices (prefijos),
+dejando solo el texto libre para el recorrido por subcadena.
+"""
+import re
+
+from sqlalchemy import or_, false
+
+from models.tickets import Tickets, normalize_text
+
+# Alias aceptados -> campo del plan
+FIELD_ALIASES = {
+    'id': 'id',
+    'ticket': 'id',
+    'imei': 'imei',
+    'serial': 'imei',
+    'doc': 'doc',
+    'documento': 'doc',
+    'cliente': 'doc',
+    'code': 'code',
+    'codigo': 'code',
+    'ref': 'ref',
+    'referencia': 'ref',
+    'tech': 'tech',
+    'tecnico': 'tech',
+    'state': 'state',
+    'estado': 'state',
+    'priority': 'priority',
+    'prioridad': 'priority',
+    'city': 'city',
+    'ciudad': 'city',
+}
+
+# Valores canónicos para comparar por igualdad sin LOWER()
+TICKET_STATES = ('Sin asignar', 'Asignado', 'Reingreso', 'En proceso', 'En Revision', 'Terminado')
+TICKET_PRIORITIES = ('Alta', 'Media', 'Baja')
+
+# Un término libre solo con dígitos y al menos esta longitud se trata como IMEI o documento
+IDENTIFIER_MIN_LENGTH = 8
+
+# Mayor valor de Tickets.id_ticket (columna Integer de 32 bits)
+MAX_TICKET_ID = 2 ** 31 - 1
+
+_FIELD_TERM_PATTERN = re.compile(r'(\w+):(?:"([^"]*)"|(\S+))', re.UNICODE)
+
+
+def ticket_id_value(value):
+    """
+    Id de ticket de un término numérico, o None si no es numérico o no cabe en la columna
+    (ej. un ICCID pegado en la búsqueda: se compara solo por prefijo, no con el id)
+    """
+    value = str(value).strip()
+    if not value.isdigit():
+        return None
+    ticket_id = int(value)
+    return ticket_id if ticket_id <= MAX_TICKET_ID else None
+
+
+def escape_like(value):
+    """Escapa los comodines de LIKE para usar el valor como prefijo literal"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _canonical(value, choices):
+    """Retorna el valor canónico que coincide sin distinguir mayúsculas, o el valor original"""
+    for choice in choices:
+        if choice.lower() == value.lower():
+            return choice
+    return value
+
+
+def normalized_prefix_condition(column, value):
+    """
+    Prefijo sobre una columna normalizada (city_normalized, technical_name_normalized,
+    reference_normalized): sin tildes ni mayúsculas y resuelto con el índice de la columna
+    """
+    return column.like(f"{escape_like(normalize_text(value))}%", escape='\\')
+
+
+def city_condition(value):
+    """Ciudad sin distinguir tildes ni mayúsculas ("medellin" encuentra "Medellín")"""
+    return normalized_prefix_condition(Tickets.city_normalized, value)
+
+
+class SearchQueryPlan:
+    """
+    Plan de una búsqueda: condiciones por campo, identificador directo y texto libre.
+
+    Attributes:
+        field_terms: Lista de (campo, valor) en el orden en que se escribieron
+        free_text: Texto sin campo (se resuelve con el backend de búsqueda)
+        identifier: Término libre numérico que se intenta primero como IMEI/documento
+    """
+
+    def __init__(self, field_terms=None, free_text=''):
+        self.field_terms = field_terms or []
+        self.free_text = free_text
+        self.identifier = None
+        if not self.field_terms and free_text.isdigit() and len(free_text) >= IDENTIFIER_MIN_LENGTH:
+            self.identifier = free_text
+
+    @property
+    def is_empty(self):
+        return not self.field_terms and not self.free_text
+
+    def build_conditions(self, use_identifier=False):
+        """
+        Construye las condiciones SQL de los términos por campo.
+
+        Args:
+            use_identifier: Si True, el término libre numérico se resuelve como
+                prefijo de IMEI o documento (dos rangos de índice) en vez de texto libre
+
+        Returns:
+            list: Condiciones SQLAlchemy para filter()
+        """
+        conditions = []
+        for field, value in self.field_terms:
+            if field == 'id':
+                # Búsqueda por clave primaria
+                ticket_id = ticket_id_value(value)
+                conditions.append(Tickets.id_ticket == ticket_id if ticket_id is not None else false())
+            elif field == 'imei':
+                conditions.append(Tickets.IMEI.like(f"{escape_like(value)}%", escape='\\'))
+            elif field == 'doc':
+                conditions.append(Tickets.document_client.like(f"{escape_like(value)}%", escape='\\'))
+            elif field == 'code':
+                conditions.append(Tickets.product_code.like(f"{escape_like(value)}%", escape='\\'))
+            elif field == 'ref':
+                conditions.append(normalized_prefix_condition(Tickets.reference_normalized, value))
+            elif field == 'tech':
+                conditions.append(normalized_prefix_condition(Tickets.technical_name_normalized, value))
+            elif field == 'state':
+                conditions.append(Tickets.state == _canonical(value, TICKET_STATES))
+            elif field == 'priority':
+                conditions.append(Tickets.priority == _canonical(value, TICKET_PRIORITIES))
+            elif field == 'city':
+                conditions.append(city_condition(value))
+
+        if use_identifier and self.identifier:
+            prefix = f"{self.identifier}%"
+            conditions.append(or_(Tickets.IMEI.like(prefix), Tickets.document_client.like(prefix)))
+
+        return conditions
+
+
+def parse_search_query(search_term):
+    """
+    Interpreta un término de búsqueda con campos.
+
+    Los nombres de campo desconocidos (ej. "http:algo") se conservan como texto libre.
+
+    Args:
+        search_term (str): Término escrito por el usuario
+
+    Returns:
+        SearchQueryPlan: Plan de consulta
+    """
+    field_terms = []
+    free_parts = []
+    position = 0
+
+    for match in _FIELD_TERM_PATTERN.finditer(search_term or ''):
+        field = FIELD_ALIASES.get(match.group(1).lower())
+        value = (match.group(2) if match.group(2) is not None else match.group(3)).strip()
+        if field is None or not value:
+            continue
+        free_parts.append(search_term[position:match.start()])
+        field_terms.append((field, value))
+        position = match.end()
+
+    free_parts.append((search_term or '')[position:])
+    free_text = ' '.join(' '.join(free_parts).split())
+
+    return SearchQueryPlan(field_terms, free_text)
@@ -1,15 +1,83 @@
 """
 Servicio de búsqueda unificado para el sistema de tickets
 Permite búsqueda completa sin limitaciones de paginado
-Busca por: id, técnico, referencia, prioridad, documento
+Busca por: id, técnico, referencia, prioridad, documento, comentario
 """
 
 from sqlalchemy import or_, and_, func
-from models.tickets import Tickets
+from models.tickets import Tickets, normalize_document
 from models import db
+from services.search_backends import get_search_backend
+from services.search_query import parse_search_query
+from services.cache_manager import get_cache_manager
+from services.ticket_events import on_ticket_change
+from services.single_flight import SingleFlight
+from services.pagination_service import encode_keyset_cursor, decode_keyset_cursor, keyset_condition
+from services.ticket_rows import project_ticket_rows, attach_problems
 import re
 
 
+# TTL de los resultados de búsqueda cacheados (segundos)
+SEARCH_CACHE_TTL = 120
+
+# Máximo de IDs por consulta IN (...) al recuperar resultados cacheados
+FETCH_BATCH_SIZE = 1000
+
+# Filas por bloque en la búsqueda por cursor (modo streaming)
+SEARCH_CHUNK_SIZE = 50
+
+
+def _search_generation_name(ticket_type):
+    """Contador de generación de las búsquedas de un tipo (None = todos los tipos)"""
+    return f"search:{'all' if ticket_type is None else ticket_type}"
+
+
+def _search_cache_key(prefix, search_term, ticket_type, limit=None):
+    """
+    Clave de caché de una búsqueda: (término normalizado, tipo, límite) más la
+    generación actual del tipo, así una escritura deja inalcanzables los resultados previos.
+    """
+    generation = get_cache_manager().get_generation(_search_generation_name(ticket_type))
+    normalized_term = ' '.join(search_term.lower().split())
+    return f"{prefix}:{ticket_type}:{generation}:{limit}:{normalized_term}"
+
+
+def _search_cache_tags(ticket_type):
+    """Etiqueta de las búsquedas cacheadas de un tipo (la misma del contador de generación)"""
+    return (_search_generation_name(ticket_type),)
+
+
+def _invalidate_search_cache(action, snapshot):
+    """
+    Avanza la generación de las búsquedas afectadas al crear, editar o cambiar de estado
+    un ticket y elimina sus resultados cacheados por etiqueta (no esperan a vencer)
+    """
+    cache = get_cache_manager()
+    ticket_types = {snapshot.get('type_of_service')}
+    ticket_types.add(snapshot.get('_previous', {}).get('type_of_service'))
+    names = [_search_generation_name(t) for t in ticket_types if t is not None]
+    names.append(_search_generation_name(None))
+    for name in names:
+        cache.bump_generation(name)
+    cache.invalidate_tag(*names)
+
+
+on_ticket_change(_invalidate_search_cache)
+
+# Búsquedas idénticas simultáneas comparten una sola ejecución
+_search_flight = SingleFlight('search_tickets')
+
+
+def _fetch_tickets_by_ids(ticket_ids):
+    """Recupera las filas (TicketRow) por clave primaria conservando el orden de ticket_ids"""
+    by_id = {}
+    for start in range(0, len(ticket_ids), FETCH_BATCH_SIZE):
+        batch = ticket_ids[start:start + FETCH_BATCH_SIZE]
+        for ticket in project_ticket_rows(Tickets.query.filter(Tickets.id_ticket.in_(batch))):
+            by_id[ticket.id_ticket] = ticket
+    return [by_id[ticket_id] for ticket_id in ticket_ids if ticket_id in by_id]
+
+
 class SearchService:
     """
     Servicio de búsqueda unificado para todos los módulos de tickets.
@@ -17,24 +85,26 @@ class SearchService:
     """
     
     @staticmethod
-    def search_tickets(search_term, ticket_type=None, limit=None):
+    def build_search_query(search_term, ticket_type=None, extra_filters=None, use_identifier=False):
         """
-        Busca tickets por múltiples criterios sin limitaciones de paginado.
+        Construye la consulta de búsqueda sin ejecutarla.
+        
+        El término admite campos (imei:, doc:, id:, state:, city:, ref:, code:,
+        tech:, priority:) que se resuelven con índices; solo el texto libre
+        pasa por el backend de búsqueda.
         
         Args:
-            search_term (str): Término de búsqueda
+            search_term (str): Término de búsqueda ya limpio
             ticket_type (str, optional): Tipo de ticket ("0"=ST, "1"=RI, "2"=GA)
-            limit (int, optional): Límite de resultados (None = sin límite)
+            extra_filters (list, optional): Condiciones SQL adicionales
+            use_identifier (bool): Resolver un término numérico largo como prefijo de IMEI/documento
             
         Returns:
-            list: Lista de tickets que coinciden con la búsqueda
+            Query de SQLAlchemy ordenado por actividad, o None si no puede haber resultados
         """
-        if not search_term or not search_term.strip():
-            return []
-            
-        # Limpiar y preparar el término de búsqueda
-        clean_term = search_term.strip()
-        search_pattern = f"%{clean_term}%"
+        plan = parse_search_query(search_term)
+        if plan.is_empty:
+            return None
         
         # Query base
         query = Tickets.query
@@ -43,46 +113,209 @@ class SearchService:
         if ticket_type is not None:
             query = query.filter(Tickets.type_of_service == ticket_type)
         
-        # Aplicar condiciones de búsqueda en múltiples campos
-        search_conditions = or_(
-            # Búsqueda por ID del ticket
-            func.cast(Tickets.id_ticket, db.String).ilike(search_pattern),
-            
-            # Búsqueda por técnico (nombre)
-            Tickets.technical_name.ilike(search_pattern),
-            
-            # Búsqueda por referencia del producto
-            Tickets.reference.ilike(search_pattern),
-            
-            # Búsqueda por prioridad
-            Tickets.priority.ilike(search_pattern),
+        # Filtros adicionales (ej. técnico asignado)
+        if extra_filters:
+            query = query.filter(*extra_filters)
+        
+        # Términos por campo: clave primaria y rangos de índice
+        field_conditions = plan.build_conditions(use_identifier=use_identifier)
+        if field_conditions:
+            query = query.filter(*field_conditions)
+        
+        # Texto libre según el backend configurado (Config.SEARCH_BACKEND)
+        if plan.free_text and not (use_identifier and plan.identifier):
+            search_conditions = get_search_backend().build_condition(plan.free_text, ticket_type)
+            if search_conditions is None:
+                return None
+            query = query.filter(search_conditions)
+        
+        # Ordenar por actividad más reciente (id como desempate estable para el cursor)
+        return query.order_by(Tickets.get_latest_activity_expression(), Tickets.id_ticket.desc())
+    
+    @staticmethod
+    def search_tickets(search_term, ticket_type=None, limit=None, extra_filters=None):
+        """
+        Busca tickets por múltiples criterios sin limitaciones de paginado.
+        
+        Los IDs resultantes se cachean por (término, tipo, límite) hasta la
+        siguiente escritura de un ticket de ese tipo; en un acierto solo se
+        leen esas filas por clave primaria.
+        
+        Args:
+            search_term (str): Término de búsqueda (admite campos, ver build_search_query)
+            ticket_type (str, optional): Tipo de ticket ("0"=ST, "1"=RI, "2"=GA)
+            limit (int, optional): Límite de resultados (None = sin límite)
+            extra_filters (list, optional): Condiciones SQL adicionales (no se cachean)
             
-            # Búsqueda por documento del cliente
-            Tickets.document_client.ilike(search_pattern),
+        Returns:
+            list: Filas (TicketRow) de los tickets que coinciden con la búsqueda
+        """
+        if not search_term or not search_term.strip():
+            return []
             
-            # Búsquedas adicionales útiles
-            Tickets.IMEI.ilike(search_pattern),
-            Tickets.product_code.ilike(search_pattern),
-            Tickets.city.ilike(search_pattern),
-            Tickets.state.ilike(search_pattern)
+        # Limpiar y preparar el término de búsqueda
+        clean_term = search_term.strip()
+        
+        try:
+            if extra_filters:
+                return SearchService._run_search(clean_term, ticket_type, limit, extra_filters)
+            return SearchService._cached_search(clean_term, ticket_type, limit)
+        except Exception as e:
+            print(f"Error en búsqueda de tickets: {e}")
+            return []
+    
+    @staticmethod
+    def _cached_search(clean_term, ticket_type=None, limit=None):
+        """Búsqueda con caché de IDs por generación (propaga los errores)"""
+        fetched = {}
+        
+        def fetch_ticket_ids():
+            fetched['tickets'] = SearchService._run_search(clean_term, ticket_type, limit)
+            return [ticket.id_ticket for ticket in fetched['tickets']]
+        
+        cache_key = _search_cache_key('search', clean_term, ticket_type, limit)
+        
+        # Solo se comparten los IDs: cada hilo lee sus tickets en su propia sesión
+        ticket_ids = _search_flight.do(
+            cache_key,
+            lambda: get_cache_manager().get(
+                cache_key, fetch_ticket_ids, ttl=SEARCH_CACHE_TTL, tags=_search_cache_tags(ticket_type)
+            )
         )
         
-        # Aplicar condiciones de búsqueda
-        query = query.filter(search_conditions)
+        # Quien ejecutó la búsqueda ya tiene las filas; el resto las lee por clave primaria
+        if 'tickets' in fetched:
+            return fetched['tickets']
+        return _fetch_tickets_by_ids(ticket_ids)
+    
+    @staticmethod
+    def _run_search(clean_term, ticket_type=None, limit=None, extra_filters=None):
+        """
+        Ejecuta la búsqueda contra la base de datos (propaga los errores).
+        Solo lee las columnas de las tablas de resultados (ver services.ticket_rows).
+        """
+        # Un IMEI o documento completo se busca primero por prefijo (índices);
+        # si no hay coincidencias se continúa con la búsqueda por subcadena
+        if parse_search_query(clean_term).identifier:
+            query = SearchService.build_search_query(
+                clean_term, ticket_type, extra_filters, use_identifier=True
+            )
+            results = project_ticket_rows(query.limit(limit) if limit else query)
+            if results:
+                return results
         
-        # Ordenar por fecha de creación (más recientes primero)
-        query = query.order_by(Tickets.get_latest_activity_expression())
+        query = SearchService.build_search_query(clean_term, ticket_type, extra_filters)
+        if query is None:
+            return []
         
         # Aplicar límite si se especifica
         if limit:
             query = query.limit(limit)
+        
+        return project_ticket_rows(query)
+    
+    @staticmethod
+    def search_chunk(search_term, ticket_type=None, cursor=None, chunk_size=SEARCH_CHUNK_SIZE,
+                     extra_filters=None):
+        """
+        Búsqueda por bloques con cursor (modo streaming).
+        
+        Cada bloque lee solo chunk_size + 1 filas a partir del cursor
+        (actividad, id_ticket), por lo que el tiempo de la primera fila no
+        depende de cuántos tickets coinciden. El primer bloque se cachea y las
+        búsquedas idénticas simultáneas lo comparten (como search_tickets).
+        
+        Args:
+            search_term (str): Término de búsqueda (admite campos, ver build_search_query)
+            ticket_type (str, optional): Tipo de ticket ("0"=ST, "1"=RI, "2"=GA)
+            cursor (str, optional): next_cursor del bloque anterior (None = primer bloque)
+            chunk_size (int): Filas por bloque
+            extra_filters (list, optional): Condiciones SQL adicionales (no se cachean)
             
+        Returns:
+            tuple: (lista de TicketRow, next_cursor o None si no hay más resultados)
+        
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        if not search_term or not search_term.strip():
+            return [], None
+        
+        clean_term = search_term.strip()
+        
+        # Los bloques siguientes se validan antes: un cursor inválido no es un error de búsqueda
+        if cursor:
+            decode_keyset_cursor(cursor)
+        
         try:
-            results = query.all()
-            return results
+            if cursor or extra_filters:
+                return SearchService._run_chunk(clean_term, ticket_type, cursor, chunk_size, extra_filters)
+            return SearchService._cached_first_chunk(clean_term, ticket_type, chunk_size)
         except Exception as e:
-            print(f"Error en búsqueda de tickets: {e}")
-            return []
+            print(f"Error en búsqueda de tickets por bloques: {e}")
+            return [], None
+    
+    @staticmethod
+    def _cached_first_chunk(clean_term, ticket_type=None, chunk_size=SEARCH_CHUNK_SIZE):
+        """
+        Primer bloque con caché de IDs por generación, igual que _cached_search
+        (la interfaz siempre busca por bloques). El tamaño del bloque va en la clave.
+        """
+        fetched = {}
+        
+        def fetch_first_chunk():
+            fetched['tickets'], next_cursor = SearchService._run_chunk(
+                clean_term, ticket_type, None, chunk_size
+            )
+            return [ticket.id_ticket for ticket in fetched['tickets']], next_cursor
+        
+        cache_key = _search_cache_key('search_chunk', clean_term, ticket_type, chunk_size)
+        
+        ticket_ids, next_cursor = _search_flight.do(
+            cache_key,
+            lambda: get_cache_manager().get(
+                cache_key, fetch_first_chunk, ttl=SEARCH_CACHE_TTL, tags=_search_cache_tags(ticket_type)
+            )
+        )
+        
+        if 'tickets' in fetched:
+            return fetched['tickets'], next_cursor
+        return _fetch_tickets_by_ids(list(ticket_ids)), next_cursor
+    
+    @staticmethod
+    def _run_chunk(clean_term, ticket_type=None, cursor=None, chunk_size=SEARCH_CHUNK_SIZE,
+                   extra_filters=None):
+        """Lee un bloque contra la base de datos (propaga los errores)"""
+        after = None
+        mode = 'text'
+        
+        if cursor:
+            # El cursor guarda además qué consulta generó el primer bloque
+            mode = decode_keyset_cursor(cursor)[2].get('m', 'text')
+            after = keyset_condition(cursor)
+        
+        if not cursor and parse_search_query(clean_term).identifier:
+            # Igual que search_tickets: primero el IMEI/documento por prefijo
+            query = SearchService.build_search_query(
+                clean_term, ticket_type, extra_filters, use_identifier=True
+            )
+            if query.with_entities(Tickets.id_ticket).limit(1).first() is not None:
+                mode = 'identifier'
+        
+        query = SearchService.build_search_query(
+            clean_term, ticket_type, extra_filters, use_identifier=(mode == 'identifier')
+        )
+        if query is None:
+            return [], None
+        if after is not None:
+            query = query.filter(after)
+        
+        tickets = project_ticket_rows(query.limit(chunk_size + 1))
+        if len(tickets) <= chunk_size:
+            return tickets, None
+        
+        tickets = tickets[:chunk_size]
+        return tickets, encode_keyset_cursor(tickets[-1], m=mode)
     
     @staticmethod
     def search_technical_service(search_term, limit=None):
@@ -144,29 +377,68 @@ class SearchService:
             return []
             
         # Normalizar documento del técnico
-        normalized_doc = ''.join(c for c in technician_document if c.isalnum())
+        normalized_doc = normalize_document(technician_document)
+        if not normalized_doc:
+            return []
         
-        # Buscar todos los tickets (sin filtro de tipo)
-        all_tickets = SearchService.search_tickets(search_term, ticket_type=None, limit=None)
+        # Solo los tickets abiertos del técnico (usa idx_tickets_technician_state)
+        tickets = SearchService.search_tickets(
+            search_term,
+            ticket_type=None,
+            limit=limit,
+            extra_filters=[
+                Tickets.technical_document_normalized == normalized_doc,
+                Tickets.state != 'Terminado'
+            ]
+        )
         
-        # Filtrar solo los tickets asignados al técnico
-        technician_tickets = []
-        for ticket in all_tickets:
-            if ticket.technical_document:
-                normalized_ticket_doc = ''.join(c for c in ticket.technical_document if c.isalnum())
-                if normalized_ticket_doc == normalized_doc and ticket.state != 'Terminado':
-                    technician_tickets.append(ticket)
+        # La tabla del técnico muestra los problemas: una consulta para todas las filas
+        try:
+            return attach_problems(tickets)
+        except Exception as e:
+            print(f"Error cargando problemas de los tickets: {e}")
+            return tickets
+    
+    @staticmethod
+    def search_with_summary(search_term, ticket_type=None, limit=None):
+        """
+        Busca tickets y calcula el resumen por estado, prioridad y ciudad
+        en una sola consulta: los conteos salen de una pasada sobre las filas obtenidas.
+        Ambos se sirven desde caché mientras no se escriban tickets del tipo.
         
-        # Aplicar límite si se especifica
-        if limit and len(technician_tickets) > limit:
-            technician_tickets = technician_tickets[:limit]
+        Args:
+            search_term (str): Término de búsqueda
+            ticket_type (str, optional): Tipo de ticket
+            limit (int, optional): Límite de resultados (el resumen cuenta solo las filas retornadas)
             
-        return technician_tickets
+        Returns:
+            tuple: (lista de tickets, dict de resumen)
+        """
+        if not search_term or not search_term.strip():
+            return [], SearchService.build_summary([])
+        
+        clean_term = search_term.strip()
+        
+        # La clave se toma antes de buscar para no guardar un resumen viejo bajo una generación nueva
+        summary_key = _search_cache_key('search_summary', clean_term, ticket_type, limit)
+        try:
+            tickets = SearchService._cached_search(clean_term, ticket_type, limit)
+        except Exception as e:
+            print(f"Error en búsqueda de tickets: {e}")
+            return [], SearchService.build_summary([])
+        
+        summary = get_cache_manager().get(
+            summary_key, lambda: SearchService.build_summary(tickets), ttl=SEARCH_CACHE_TTL,
+            tags=_search_cache_tags(ticket_type)
+        )
+        return tickets, summary
     
     @staticmethod
     def get_search_summary(search_term, ticket_type=None):
         """
         Obtiene un resumen de los resultados de búsqueda.
+        Si también se necesitan los tickets usar search_with_summary()
+        para no ejecutar la búsqueda dos veces.
         
         Args:
             search_term (str): Término de búsqueda
@@ -175,8 +447,20 @@ class SearchService:
         Returns:
             dict: Resumen con conteos por estado, prioridad, etc.
         """
-        tickets = SearchService.search_tickets(search_term, ticket_type)
+        _, summary = SearchService.search_with_summary(search_term, ticket_type)
+        return summary
+    
+    @staticmethod
+    def build_summary(tickets):
+        """
+        Agrupa una lista de tickets por estado, prioridad y ciudad.
         
+        Args:
+            tickets (list): Tickets (u objetos con state, priority y city)
+            
+        Returns:
+            dict: Resumen con conteos por estado, prioridad, etc.
+        """
         if not tickets:
             return {
                 'total': 0,
@@ -242,7 +526,8 @@ class SearchService:
             }
         
         # Verificar caracteres no permitidos (opcional)
-        if re.search(r'[<>"\';]', clean_term):
+        # Las comillas dobles se permiten para valores con espacios: state:"En proceso"
+        if re.search(r'[<>\';]', clean_term):
             return {
                 'is_valid': False,
                 'message': 'El término de búsqueda contiene caracteres no permitidos'
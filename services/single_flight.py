@@ -0,0 +1,87 @@
+"""
+Coalescencia de llamadas concurrentes idénticas (single-flight)
+Si varios hilos piden la misma clave a la vez, solo el primero ejecuta la función;
+los demás esperan y reciben el mismo resultado (o la misma excepción).
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    """Ejecución en curso de una clave"""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Grupo de llamadas coalescidas por clave.
+
+    A diferencia de una caché, el resultado no se conserva: en cuanto la
+    ejecución termina, la siguiente llamada con la misma clave vuelve a ejecutar.
+    """
+
+    def __init__(self, name: str = 'single_flight'):
+        self.name = name
+        self.calls: Dict[Hashable, _Call] = {}
+        self.lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Ejecuta fn() una sola vez para todas las llamadas concurrentes con la misma clave
+
+        Args:
+            key: Clave de la llamada (ej. término de búsqueda normalizado)
+            fn: Función sin argumentos que produce el resultado
+
+        Returns:
+            El resultado de fn() (compartido: no debe modificarse)
+
+        Raises:
+            La excepción de fn(), también en los hilos que esperaban
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self.calls[key] = _Call()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estadísticas del grupo"""
+        with self.lock:
+            return {
+                'name': self.name,
+                'in_flight': len(self.calls),
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+            }
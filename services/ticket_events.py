@@ -0,0 +1,137 @@
+"""
+Eventos de escritura de tickets
+Notifica a índices y cachés en memoria cuando un ticket se crea, actualiza o elimina.
+Los cambios se acumulan durante el flush y se publican solo después del commit,
+así un rollback nunca deja índices con datos que no existen en la base de datos.
+"""
+import threading
+from typing import Callable, Dict, Any, List
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from models.tickets import Tickets
+
+TICKET_INSERTED = 'insert'
+TICKET_UPDATED = 'update'
+TICKET_DELETED = 'delete'
+
+_PENDING_KEY = '_ticket_changes'
+
+_listeners: List[Callable] = []
+_registered = False
+_lock = threading.Lock()
+
+
+def on_ticket_change(callback: Callable[[str, Dict[str, Any]], None]) -> Callable:
+    """
+    Registra una función que se ejecuta después de cada commit que modifique tickets.
+
+    Args:
+        callback: Función callback(action, snapshot). ``action`` es 'insert',
+            'update' o 'delete' y ``snapshot`` un dict con las columnas del ticket.
+            En las actualizaciones ``snapshot['_previous']`` contiene los valores
+            anteriores de las columnas modificadas.
+
+    Returns:
+        El mismo callback (permite usarlo como decorador)
+    """
+    _register_events()
+    with _lock:
+        if callback not in _listeners:
+            _listeners.append(callback)
+    return callback
+
+
+def remove_ticket_listener(callback: Callable):
+    """Elimina un callback registrado previamente"""
+    with _lock:
+        if callback in _listeners:
+            _listeners.remove(callback)
+
+
+def snapshot_ticket(ticket) -> Dict[str, Any]:
+    """Copia los valores de columna de un ticket a un dict independiente de la sesión"""
+    return {
+        attr.key: getattr(ticket, attr.key, None)
+        for attr in inspect(Tickets).column_attrs
+    }
+
+
+def _previous_values(ticket) -> Dict[str, Any]:
+    """Valores anteriores de las columnas modificadas en este flush"""
+    state = inspect(ticket)
+    previous = {}
+    for attr in inspect(Tickets).column_attrs:
+        history = state.attrs[attr.key].history
+        if history.deleted:
+            previous[attr.key] = history.deleted[0]
+    return previous
+
+
+def _keep_previous(target, value, oldvalue, initiator):
+    # Sin cambios: el listener existe solo para activar active_history
+    return value
+
+
+def _queue_change(action, target):
+    session = object_session(target)
+    if session is None:
+        return
+    snapshot = snapshot_ticket(target)
+    if action == TICKET_UPDATED:
+        # Permite a los listeners limpiar lo indexado con los valores viejos
+        snapshot['_previous'] = _previous_values(target)
+    session.info.setdefault(_PENDING_KEY, []).append((action, snapshot))
+
+
+def _after_insert(mapper, connection, target):
+    _queue_change(TICKET_INSERTED, target)
+
+
+def _after_update(mapper, connection, target):
+    _queue_change(TICKET_UPDATED, target)
+
+
+def _after_delete(mapper, connection, target):
+    _queue_change(TICKET_DELETED, target)
+
+
+def _after_commit(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if not changes:
+        return
+
+    with _lock:
+        listeners = list(_listeners)
+
+    for action, snapshot in changes:
+        for listener in listeners:
+            try:
+                listener(action, snapshot)
+            except Exception as e:
+                print(f"Error notificando cambio del ticket {snapshot.get('id_ticket')}: {e}")
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _register_events():
+    """Registra los listeners de SQLAlchemy una sola vez por proceso"""
+    global _registered
+    with _lock:
+        if _registered:
+            return
+        event.listen(Tickets, 'after_insert', _after_insert)
+        event.listen(Tickets, 'after_update', _after_update)
+        event.listen(Tickets, 'after_delete', _after_delete)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
+        # Con active_history el valor anterior se carga antes de asignar, aunque el ticket
+        # esté vencido por un commit previo (si no, _previous queda vacío)
+        for attr in inspect(Tickets).column_attrs:
+            event.listen(
+                getattr(Tickets, attr.key), 'set', _keep_previous, retval=True, active_history=True
+            )
+        _registered = True
@@ -0,0 +1,95 @@
+"""
+Filas livianas para las tablas de tickets
+Los listados y la búsqueda seleccionan solo las columnas que usan los parciales
+(templates/partials/*_table_rows.html) y las devuelven como TicketRow: sin identity map,
+sin seguimiento de cambios y sin hidratar el resto de columnas del modelo.
+"""
+from typing import Dict, List
+
+from models import db
+from models.tickets import Tickets, ACTIVITY_FLOOR
+
+# Columnas que pintan los parciales, más last_activity para los cursores keyset
+TICKET_ROW_FIELDS = (
+    'id_ticket',
+    'document_client',
+    'technical_name',
+    'reference',
+    'type_of_service',
+    'state',
+    'priority',
+    'city',
+    'service_value',
+    'spare_value',
+    'total',
+    'last_activity',
+)
+
+TICKET_ROW_COLUMNS = tuple(getattr(Tickets, field) for field in TICKET_ROW_FIELDS)
+
+# Máximo de IDs por consulta IN (...) al cargar problemas
+PROBLEMS_BATCH_SIZE = 1000
+
+
+class TicketRow:
+    """
+    Fila de ticket de solo lectura para las tablas.
+
+    Expone los mismos atributos que Tickets para los campos de TICKET_ROW_FIELDS,
+    así los parciales la pintan sin cambios. ``problems`` queda vacío salvo que
+    se cargue con attach_problems().
+    """
+
+    __slots__ = TICKET_ROW_FIELDS + ('problems',)
+
+    def __init__(self, *values):
+        for field, value in zip(TICKET_ROW_FIELDS, values):
+            setattr(self, field, value)
+        self.problems = ()
+
+    def get_latest_activity(self):
+        """Misma firma que Tickets.get_latest_activity (usada por los cursores)"""
+        return self.last_activity or ACTIVITY_FLOOR
+
+    def __repr__(self):
+        return f"<TicketRow {self.id_ticket}>"
+
+
+def project_ticket_rows(query):
+    """
+    Ejecuta un Query de Tickets seleccionando solo TICKET_ROW_COLUMNS
+
+    Conserva los filtros, el orden, el límite y los parámetros del Query.
+
+    Returns:
+        list: TicketRow en el orden del Query
+    """
+    return [TicketRow(*row) for row in query.with_entities(*TICKET_ROW_COLUMNS)]
+
+
+def attach_problems(rows: List[TicketRow]) -> List[TicketRow]:
+    """
+    Carga los problemas de varias filas en una sola consulta (para view_technical_table_rows)
+
+    Returns:
+        La misma lista de filas
+    """
+    from models.problems import Problems
+    from models.problemsTickets import Problems_tickets
+
+    if not rows:
+        return rows
+
+    problems_by_ticket: Dict[int, list] = {}
+    ticket_ids = [row.id_ticket for row in rows]
+    for start in range(0, len(ticket_ids), PROBLEMS_BATCH_SIZE):
+        batch = ticket_ids[start:start + PROBLEMS_BATCH_SIZE]
+        query = db.session.query(Problems_tickets.id_ticket, Problems).join(
+            Problems, Problems.id == Problems_tickets.id_problem
+        ).filter(Problems_tickets.id_ticket.in_(batch))
+        for ticket_id, problem in query:
+            problems_by_ticket.setdefault(ticket_id, []).append(problem)
+
+    for row in rows:
+        row.problems = problems_by_ticket.get(row.id_ticket, [])
+    return rows
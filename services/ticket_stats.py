@@ -0,0 +1,126 @@
+"""
+Estadísticas de tickets por tipo de servicio
+Conteos por estado, ciudad y día construidos con SQLAlchemy Core: una consulta agrupada
+por dimensión, sobre la tabla del modelo (con su esquema) y sin SQL propio de un motor,
+así funcionan igual en PostgreSQL, SQL Server, MySQL y SQLite.
+Los resultados se cachean unos segundos para que el dashboard pueda consultarlos seguido.
+"""
+from datetime import datetime, time, timedelta
+from typing import Dict, Any
+
+from sqlalchemy import select, func, Date
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from models import db
+from models.tickets import Tickets, get_colombia_utc_now
+from services.cache_manager import get_cache_manager
+
+# TTL de las estadísticas cacheadas (segundos)
+STATS_CACHE_TTL = 30
+
+# Ciudades con más tickets que se listan
+TOP_CITIES = 10
+
+# Días hacia atrás de la actividad reciente
+RECENT_DAYS = 30
+
+
+class ticket_day(FunctionElement):
+    """Día (sin hora) de una columna DateTime, compilado según el motor"""
+
+    type = Date()
+    inherit_cache = True
+    name = 'ticket_day'
+
+
+@compiles(ticket_day)
+def _compile_ticket_day(element, compiler, **kw):
+    # CAST(... AS DATE) sirve en PostgreSQL, SQL Server, MySQL y Oracle
+    return f"CAST({compiler.process(element.clauses, **kw)} AS DATE)"
+
+
+@compiles(ticket_day, 'sqlite')
+def _compile_ticket_day_sqlite(element, compiler, **kw):
+    # En SQLite CAST(... AS DATE) convierte a número; DATE() conserva 'YYYY-MM-DD'
+    return f"DATE({compiler.process(element.clauses, **kw)})"
+
+
+def _grouped_counts(column, ticket_type, *conditions, limit=None, order_by_column=False,
+                    empty_label=None):
+    """
+    Conteo de tickets de un tipo agrupado por una columna o expresión
+
+    Returns:
+        dict: valor (o empty_label si es NULL) -> número de tickets, en el orden de la consulta
+    """
+    count = func.count(Tickets.id_ticket).label('count')
+    statement = select(column.label('value'), count).where(
+        Tickets.type_of_service == ticket_type, *conditions
+    ).group_by(column)
+
+    if order_by_column:
+        statement = statement.order_by(column.desc())
+    else:
+        statement = statement.order_by(count.desc())
+    if limit:
+        statement = statement.limit(limit)
+
+    rows = db.session.execute(statement, bind_arguments={'mapper': Tickets.__mapper__})
+    counts = {}
+    for value, total in rows:
+        key = empty_label if value is None else value
+        counts[key] = counts.get(key, 0) + total
+    return counts
+
+
+def _day_key(day):
+    """Los motores devuelven date o texto; el resultado usa siempre 'YYYY-MM-DD'"""
+    return day.isoformat() if hasattr(day, 'isoformat') else str(day)
+
+
+def compute_ticket_stats(ticket_type) -> Dict[str, Any]:
+    """
+    Calcula las estadísticas de un tipo de ticket sin caché
+
+    Args:
+        ticket_type: type_of_service ("0"=ST, "1"=RI, "2"=GA)
+
+    Returns:
+        dict: total, by_state, by_city (las TOP_CITIES con más tickets) y
+        recent_activity (tickets creados por día en los últimos RECENT_DAYS días)
+    """
+    ticket_type = str(ticket_type)
+    since = datetime.combine(get_colombia_utc_now().date() - timedelta(days=RECENT_DAYS), time.min)
+    day = ticket_day(Tickets.creation_date)
+
+    by_state = _grouped_counts(Tickets.state, ticket_type, empty_label='Sin estado')
+    by_city = _grouped_counts(Tickets.city, ticket_type, limit=TOP_CITIES, empty_label='Sin ciudad')
+    recent_activity = _grouped_counts(
+        day, ticket_type, Tickets.creation_date >= since,
+        limit=RECENT_DAYS + 1, order_by_column=True
+    )
+
+    return {
+        # Cada ticket tiene un solo estado: la suma por estado es el total
+        'total': sum(by_state.values()),
+        'by_state': by_state,
+        'by_city': by_city,
+        'recent_activity': {_day_key(value): total for value, total in recent_activity.items()},
+    }
+
+
+def get_ticket_stats(ticket_type, ttl=STATS_CACHE_TTL) -> Dict[str, Any]:
+    """
+    Estadísticas de un tipo de ticket, cacheadas por ``ttl`` segundos
+
+    Args:
+        ticket_type: type_of_service ("0"=ST, "1"=RI, "2"=GA)
+        ttl: Segundos que se reutiliza el resultado
+
+    Returns:
+        dict: Ver compute_ticket_stats
+    """
+    return get_cache_manager().get(
+        f"ticket_stats:{ticket_type}", lambda: compute_ticket_stats(ticket_type), ttl=ttl
+    )
@@ -0,0 +1,331 @@
+"""
+Índice de trigramas en memoria para la búsqueda de tickets
+Resuelve búsquedas por subcadena (equivalentes a ILIKE '%term%') sin recorrer la tabla completa
+
+Cada trigrama guarda sus ids en un array('i') ordenado (4 bytes por id) y cada ticket
+una sola cadena con sus campos normalizados. Las listas no se modifican en sitio: una
+escritura reemplaza la lista afectada, así la intersección se hace fuera del lock.
+El índice se construye en un hilo al arrancar; mientras tanto la búsqueda usa ILIKE.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from models import db
+from models.tickets import Tickets
+
+# Campos indexados (los mismos que compara el backend ILIKE de búsqueda)
+INDEXED_FIELDS = (
+    'id_ticket',
+    'IMEI',
+    'document_client',
+    'reference',
+    'technical_name',
+    'product_code',
+    'city',
+    'state',
+    'priority',
+)
+
+# Tamaño del bloque de lectura al construir el índice
+BUILD_BATCH_SIZE = 5000
+
+# Separa el tipo y los campos en la cadena de cada ticket (no aparece en los valores)
+FIELD_SEPARATOR = '\x1f'
+
+
+def intersect_postings(lists: List[array]) -> Set[int]:
+    """
+    Intersección de listas de ids, empezando por la más corta.
+    Se recorre cada lista una sola vez contra un set de la más corta: en CPython es
+    varias veces más rápido que fusionar las listas ordenadas en un bucle de Python.
+    """
+    lists = sorted(lists, key=len)
+    result = set(lists[0])
+    for ids in lists[1:]:
+        result.intersection_update(ids)
+        if not result:
+            break
+    return result
+
+
+class TrigramIndex:
+    """
+    Índice invertido trigrama -> ids de ticket.
+
+    Cada ticket guarda además sus valores normalizados para verificar la
+    coincidencia exacta de la subcadena, por lo que el resultado es el mismo
+    que el del OR de ILIKE sobre los campos indexados pero sin escanear la tabla.
+    """
+
+    def __init__(self, fields: Tuple[str, ...] = INDEXED_FIELDS, n: int = 3):
+        self.fields = fields
+        self.n = n
+        self.postings: Dict[str, array] = {}
+        # id -> "tipo\x1fcampo1\x1fcampo2..." (normalizados)
+        self.documents: Dict[int, str] = {}
+        self.lock = threading.RLock()
+        self.ready = False
+        self.building = False
+        # Cambios publicados mientras se construye el índice (se aplican al terminar)
+        self.pending = []
+        self.built_at = None
+        self.build_time = None
+
+    @staticmethod
+    def normalize(value) -> str:
+        """Normaliza un valor para compararlo sin distinguir mayúsculas"""
+        if value is None:
+            return ''
+        return str(value).strip().lower().replace(FIELD_SEPARATOR, ' ')
+
+    def _grams(self, text: str) -> Set[str]:
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def _document(self, ticket_type, values: Iterable[object]) -> Tuple[str, Set[str]]:
+        """Cadena del ticket y sus trigramas (sin cruzar de un campo a otro)"""
+        normalized = [self.normalize(value) for value in values]
+        grams = set()
+        for value in normalized:
+            grams.update(self._grams(value))
+        return FIELD_SEPARATOR.join([str(ticket_type)] + normalized), grams
+
+    def _document_grams(self, document: str) -> Set[str]:
+        grams = set()
+        for value in document.split(FIELD_SEPARATOR)[1:]:
+            grams.update(self._grams(value))
+        return grams
+
+    def add(self, ticket_id: int, ticket_type, values: Dict[str, object]):
+        """
+        Agrega o reemplaza un ticket en el índice
+
+        Args:
+            ticket_id: ID del ticket
+            ticket_type: type_of_service del ticket
+            values: Dict campo -> valor (al menos los campos indexados)
+        """
+        document, grams = self._document(ticket_type, (values.get(field) for field in self.fields))
+        with self.lock:
+            self._remove_unlocked(ticket_id)
+            self.documents[ticket_id] = document
+            for gram in grams:
+                ids = self.postings.get(gram)
+                if ids is None:
+                    self.postings[gram] = array('i', (ticket_id,))
+                    continue
+                position = bisect_left(ids, ticket_id)
+                # Copia con el id insertado: quien esté intersectando conserva la lista anterior
+                updated = ids[:position]
+                updated.append(ticket_id)
+                updated.extend(ids[position:])
+                self.postings[gram] = updated
+
+    def remove(self, ticket_id: int):
+        """Elimina un ticket del índice"""
+        with self.lock:
+            self._remove_unlocked(ticket_id)
+
+    def _remove_unlocked(self, ticket_id):
+        document = self.documents.pop(ticket_id, None)
+        if document is None:
+            return
+        for gram in self._document_grams(document):
+            ids = self.postings.get(gram)
+            if ids is None:
+                continue
+            position = bisect_left(ids, ticket_id)
+            if position < len(ids) and ids[position] == ticket_id:
+                if len(ids) == 1:
+                    del self.postings[gram]
+                else:
+                    self.postings[gram] = ids[:position] + ids[position + 1:]
+
+    def search(self, term: str, ticket_type=None) -> Optional[List[int]]:
+        """
+        Busca los tickets cuyo algún campo indexado contiene el término
+
+        Args:
+            term: Término de búsqueda
+            ticket_type: Tipo de ticket opcional para filtrar
+
+        Returns:
+            list: IDs que coinciden, o None si el índice no puede resolver
+            la búsqueda (índice en construcción o término más corto que n)
+        """
+        needle = self.normalize(term)
+        if not self.ready or len(needle) < self.n:
+            return None
+
+        # Bajo el lock solo se toman las referencias; las listas nunca se modifican en sitio
+        with self.lock:
+            posting_lists = []
+            for gram in self._grams(needle):
+                ids = self.postings.get(gram)
+                if ids is None:
+                    return []
+                posting_lists.append(ids)
+            documents = self.documents
+
+        type_prefix = None if ticket_type is None else f"{ticket_type}{FIELD_SEPARATOR}"
+        matches = []
+        for ticket_id in intersect_postings(posting_lists):
+            document = documents.get(ticket_id)
+            if document is None:
+                continue
+            if type_prefix is not None and not document.startswith(type_prefix):
+                continue
+            # El tipo va primero: se busca solo en los campos
+            if needle in document[document.index(FIELD_SEPARATOR) + 1:]:
+                matches.append(ticket_id)
+        return matches
+
+    def start_build(self):
+        """Marca el inicio de una construcción: los cambios siguientes se guardan para aplicarlos después"""
+        with self.lock:
+            self.building = True
+            self.pending = []
+
+    def build(self, rows: Iterable[Tuple]):
+        """
+        Reconstruye el índice completo a partir de filas
+        (id_ticket, type_of_service, *campos indexados)
+        """
+        start_time = time.time()
+        postings: Dict[str, array] = {}
+        documents = {}
+        last_id = None
+        ordered = True
+        for row in rows:
+            ticket_id = row[0]
+            document, grams = self._document(row[1], row[2:])
+            documents[ticket_id] = document
+            for gram in grams:
+                ids = postings.get(gram)
+                if ids is None:
+                    postings[gram] = array('i', (ticket_id,))
+                else:
+                    ids.append(ticket_id)
+            if last_id is not None and ticket_id < last_id:
+                ordered = False
+            last_id = ticket_id
+
+        # build_from_database lee en orden de id; otras fuentes se ordenan aquí
+        if not ordered:
+            postings = {gram: array('i', sorted(ids)) for gram, ids in postings.items()}
+
+        with self.lock:
+            self.postings = postings
+            self.documents = documents
+            pending, self.pending = self.pending, []
+            for action, snapshot in pending:
+                self._apply_unlocked(action, snapshot)
+            self.building = False
+            self.ready = True
+            self.built_at = time.time()
+            self.build_time = self.built_at - start_time
+
+    def build_from_database(self):
+        """Construye el índice leyendo solo las columnas necesarias de Tickets, en orden de id"""
+        columns = [getattr(Tickets, field) for field in self.fields]
+        query = db.session.query(
+            Tickets.id_ticket, Tickets.type_of_service, *columns
+        ).order_by(Tickets.id_ticket).execution_options(yield_per=BUILD_BATCH_SIZE)
+        with self.lock:
+            # init_trigram_index ya la marca antes de lanzar el hilo
+            if not self.building:
+                self.start_build()
+        try:
+            self.build(query)
+        finally:
+            with self.lock:
+                self.building = False
+
+    def _apply_unlocked(self, action, snapshot):
+        ticket_id = snapshot.get('id_ticket')
+        if action == 'delete':
+            self._remove_unlocked(ticket_id)
+        else:
+            self.add(ticket_id, snapshot.get('type_of_service'), snapshot)
+
+    def apply_change(self, action: str, snapshot: Dict[str, object]):
+        """Aplica un cambio publicado por services.ticket_events"""
+        if snapshot.get('id_ticket') is None:
+            return
+        with self.lock:
+            if self.building:
+                self.pending.append((action, dict(snapshot)))
+            if self.ready:
+                self._apply_unlocked(action, snapshot)
+
+    def get_stats(self) -> Dict[str, object]:
+        """Retorna estadísticas del índice"""
+        with self.lock:
+            return {
+                'ready': self.ready,
+                'building': self.building,
+                'documents': len(self.documents),
+                'grams': len(self.postings),
+                'postings_bytes': sum(ids.itemsize * len(ids) for ids in self.postings.values()),
+                'built_at': self.built_at,
+                'build_time': self.build_time,
+            }
+
+
+# Instancia global del índice
+_trigram_index = None
+
+
+def get_trigram_index() -> TrigramIndex:
+    """Obtiene la instancia global del índice de trigramas"""
+    global _trigram_index
+    if _trigram_index is None:
+        _trigram_index = TrigramIndex()
+    return _trigram_index
+
+
+def _build_in_background(app, index):
+    try:
+        with app.app_context():
+            index.build_from_database()
+        print(f"Índice de búsqueda construido: {len(index.documents)} tickets "
+              f"en {index.build_time:.2f}s")
+    except Exception as e:
+        # Sin índice la búsqueda sigue funcionando con el recorrido ILIKE
+        print(f"Error construyendo índice de búsqueda: {e}")
+
+
+def init_trigram_index(background=True) -> bool:
+    """
+    Construye el índice y lo mantiene al día con las escrituras de tickets.
+    Por defecto lo construye en un hilo: el arranque no espera y, hasta que el
+    índice esté listo, la búsqueda usa ILIKE.
+    Debe llamarse dentro de un contexto de aplicación.
+
+    Returns:
+        bool: True si la construcción empezó (o terminó, con background=False)
+    """
+    from flask import current_app
+    from services.ticket_events import on_ticket_change
+
+    index = get_trigram_index()
+    on_ticket_change(index.apply_change)
+
+    if background:
+        index.start_build()
+        threading.Thread(
+            target=_build_in_background, args=(current_app._get_current_object(), index),
+            name='trigram-index-build', daemon=True
+        ).start()
+        return True
+
+    try:
+        index.build_from_database()
+        print(f"Índice de búsqueda construido: {len(index.documents)} tickets "
+              f"en {index.build_time:.2f}s")
+        return True
+    except Exception as e:
+        print(f"Error construyendo índice de búsqueda: {e}")
+        return False
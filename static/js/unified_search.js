@@ -6,21 +6,29 @@ const UnifiedSearch = {
     modules: {
         'technical_service': {
             searchUrl: '/tickets/search_tickets',
+            suggestUrl: '/tickets/suggest_tickets',
+            ticketType: '0',
             tableBodyId: 'ticketsTableBody',
             searchInputId: 'searchInput'
         },
         'internal_repair': {
             searchUrl: '/tickets/search_tickets', 
+            suggestUrl: '/tickets/suggest_tickets',
+            ticketType: '1',
             tableBodyId: 'repairsTableBody',
             searchInputId: 'searchRepairs'
         },
         'warranty': {
             searchUrl: '/tickets/search_tickets',
+            suggestUrl: '/tickets/suggest_tickets',
+            ticketType: '2',
             tableBodyId: 'ticketsTableBody',
             searchInputId: 'searchInput'
         },
         'view_technical': {
             searchUrl: '/tickets/search_tickets',
+            suggestUrl: '/tickets/suggest_tickets',
+            ticketType: null,
             tableBodyId: 'ticketsTableBody',
             searchInputId: 'searchInput'
         }
@@ -30,6 +38,20 @@ const UnifiedSearch = {
     isSearchActive: false,
     originalContent: null,
     
+    // Estado de la búsqueda por bloques (cursor)
+    currentTerm: null,
+    nextCursor: null,
+    loadedResults: 0,
+    isLoadingMore: false,
+    searchSequence: 0,
+    scrollThreshold: 300,
+    
+    // Sugerencias mientras se escribe
+    suggestTimer: null,
+    suggestDelay: 150,
+    suggestMinLength: 2,
+    suggestSequence: 0,
+    
     init: function(moduleName) {
         this.currentModule = moduleName;
         const config = this.modules[moduleName];
@@ -72,6 +94,17 @@ const UnifiedSearch = {
             // Crear área de mensajes
             this.createMessageArea(config);
         }
+        
+        // Lista de sugerencias asociada al input
+        this.createSuggestionList(searchInput);
+    },
+    
+    createSuggestionList: function(searchInput) {
+        const dataList = document.createElement('datalist');
+        dataList.id = 'searchSuggestions';
+        searchInput.setAttribute('list', dataList.id);
+        searchInput.setAttribute('autocomplete', 'off');
+        searchInput.parentNode.appendChild(dataList);
     },
     
     createClearButton: function(inputGroup) {
@@ -119,12 +152,13 @@ const UnifiedSearch = {
                 }
             });
             
-            // Mostrar/ocultar botón de limpiar
+            // Mostrar/ocultar botón de limpiar y pedir sugerencias
             searchInput.addEventListener('input', () => {
                 if (clearButton) {
                     const hasText = searchInput.value.trim().length > 0;
                     clearButton.style.display = hasText ? 'inline-block' : 'none';
                 }
+                this.scheduleSuggestions(config, searchInput.value.trim());
             });
         }
         
@@ -134,6 +168,14 @@ const UnifiedSearch = {
                 this.clearSearch(config);
             });
         }
+        
+        // Cargar el siguiente bloque de resultados al acercarse al final de la página
+        window.addEventListener('scroll', () => {
+            const remaining = document.documentElement.scrollHeight - (window.innerHeight + window.scrollY);
+            if (remaining < this.scrollThreshold) {
+                this.loadMoreResults(config);
+            }
+        }, { passive: true });
     },
     
     performSearch: function(config) {
@@ -145,6 +187,11 @@ const UnifiedSearch = {
             return;
         }
         
+        // La búsqueda completa reemplaza cualquier sugerencia pendiente
+        clearTimeout(this.suggestTimer);
+        this.suggestSequence++;
+        this.renderSuggestions([]);
+        
         // Guardar contenido original si es la primera búsqueda
         if (!this.isSearchActive) {
             this.saveOriginalContent(config);
@@ -153,9 +200,17 @@ const UnifiedSearch = {
         // Mostrar indicador de carga
         this.showLoading(config);
         
-        // Realizar petición AJAX
+        // Nueva búsqueda: descartar el cursor y las respuestas pendientes de la anterior
+        const sequence = ++this.searchSequence;
+        this.currentTerm = searchTerm;
+        this.nextCursor = null;
+        this.loadedResults = 0;
+        this.isLoadingMore = false;
+        
+        // Realizar petición AJAX (primer bloque)
         const formData = new FormData();
         formData.append('search', searchTerm);
+        formData.append('stream', '1');
         
         fetch(config.searchUrl, {
             method: 'POST',
@@ -166,7 +221,9 @@ const UnifiedSearch = {
         })
         .then(response => response.json())
         .then(data => {
-            this.handleSearchResponse(data, config);
+            if (sequence === this.searchSequence) {
+                this.handleSearchResponse(data, config);
+            }
         })
         .catch(error => {
             console.error('Error en búsqueda:', error);
@@ -185,8 +242,10 @@ const UnifiedSearch = {
                 tableBody.innerHTML = data.html;
             }
             
-            // Mostrar mensaje de resultados
-            this.showSearchMessage(config, data.message, data.total_results);
+            // Mostrar mensaje de resultados (los endpoints sin streaming retornan todo de una vez)
+            this.nextCursor = data.next_cursor || null;
+            this.loadedResults = data.loaded_results ?? data.total_results;
+            this.showSearchMessage(config, data.message, this.formatResultCount());
             
             // Ocultar paginación durante búsqueda
             this.hidePagination();
@@ -199,6 +258,112 @@ const UnifiedSearch = {
         }
     },
     
+    scheduleSuggestions: function(config, term) {
+        clearTimeout(this.suggestTimer);
+        
+        if (!config.suggestUrl || term.length < this.suggestMinLength) {
+            this.renderSuggestions([]);
+            return;
+        }
+        
+        // Esperar a que el usuario haga una pausa para no pedir una sugerencia por tecla
+        this.suggestTimer = setTimeout(() => {
+            this.fetchSuggestions(config, term);
+        }, this.suggestDelay);
+    },
+    
+    fetchSuggestions: function(config, term) {
+        const sequence = ++this.suggestSequence;
+        const params = new URLSearchParams({ q: term });
+        if (config.ticketType !== null) {
+            params.append('type', config.ticketType);
+        }
+        
+        fetch(`${config.suggestUrl}?${params.toString()}`, {
+            headers: {
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            // Solo la respuesta de la última tecla
+            if (sequence === this.suggestSequence && data.status === 'success') {
+                this.renderSuggestions(data.suggestions);
+            }
+        })
+        .catch(error => {
+            console.error('Error obteniendo sugerencias:', error);
+        });
+    },
+    
+    renderSuggestions: function(suggestions) {
+        const dataList = document.getElementById('searchSuggestions');
+        if (!dataList) {
+            return;
+        }
+        
+        dataList.innerHTML = '';
+        suggestions.forEach(suggestion => {
+            const option = document.createElement('option');
+            option.value = suggestion.query;
+            option.label = `${suggestion.value} (${suggestion.count})`;
+            dataList.appendChild(option);
+        });
+    },
+    
+    loadMoreResults: function(config) {
+        if (!this.isSearchActive || !this.nextCursor || this.isLoadingMore) {
+            return;
+        }
+        
+        this.isLoadingMore = true;
+        const sequence = this.searchSequence;
+        
+        const formData = new FormData();
+        formData.append('search', this.currentTerm);
+        formData.append('cursor', this.nextCursor);
+        
+        fetch(config.searchUrl, {
+            method: 'POST',
+            body: formData,
+            headers: {
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            // Ignorar bloques de una búsqueda que ya fue reemplazada o limpiada
+            if (sequence !== this.searchSequence) {
+                return;
+            }
+            
+            if (data.status === 'success') {
+                const tableBody = document.getElementById(config.tableBodyId);
+                if (tableBody && data.html) {
+                    tableBody.insertAdjacentHTML('beforeend', data.html);
+                }
+                this.nextCursor = data.next_cursor || null;
+                this.loadedResults += data.loaded_results || 0;
+                this.showSearchMessage(config, data.message, this.formatResultCount());
+            } else {
+                this.nextCursor = null;
+                this.showToast('error', data.message || 'Error cargando más resultados');
+            }
+            this.isLoadingMore = false;
+        })
+        .catch(error => {
+            console.error('Error cargando más resultados:', error);
+            if (sequence === this.searchSequence) {
+                this.isLoadingMore = false;
+            }
+        });
+    },
+    
+    formatResultCount: function() {
+        // Con más bloques pendientes el total aún no se conoce
+        return this.nextCursor ? `${this.loadedResults}+` : `${this.loadedResults}`;
+    },
+    
     clearSearch: function(config) {
         const searchInput = document.getElementById(config.searchInputId);
         const clearButton = document.getElementById('clearSearchButton');
@@ -234,6 +399,11 @@ const UnifiedSearch = {
         // Resetear estado
         this.isSearchActive = false;
         this.originalContent = null;
+        this.searchSequence++;
+        this.currentTerm = null;
+        this.nextCursor = null;
+        this.loadedResults = 0;
+        this.isLoadingMore = false;
     },
     
     saveOriginalContent: function(config) {